@@ -118,23 +118,27 @@ const OutletMap = forwardRef(
 
           setOutlets(processedData);
 
-          // Pre-fetch operating hours
+          // Pre-fetch operating hours, resolving any missing ones through the batch endpoint
           const hoursData = {};
+          const missingIds = [];
           for (const outlet of processedData) {
-            try {
-              if (!outlet?.id) continue;
+            if (!outlet?.id) continue;
+
+            if (outlet.operating_hours?.length > 0) {
+              hoursData[outlet.id] = outlet.operating_hours;
+            } else {
+              missingIds.push(outlet.id);
+            }
+          }
 
-              if (outlet.operating_hours?.length > 0) {
+          if (missingIds.length > 0) {
+            try {
+              const batch = await api.getOutletsBatch(missingIds);
+              for (const outlet of batch) {
                 hoursData[outlet.id] = outlet.operating_hours;
-              } else {
-                const hours = await api.getOutletOperatingHours(outlet.id);
-                hoursData[outlet.id] = hours;
               }
             } catch (err) {
-              console.error(
-                `Failed to fetch hours for outlet ${outlet?.id}:`,
-                err
-              );
+              console.error("Failed to fetch operating hours:", err);
             }
           }
 
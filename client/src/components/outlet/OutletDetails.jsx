@@ -28,8 +28,8 @@ const OutletDetails = ({ outlet, onClose }) => {
   const [topOffset, setTopOffset] = useState(0);
   const outletDetailsRef = useRef(null);
 
-  // Memoized intersecting outlets
-  const intersectingOutlets = useMemo(() => {
+  // Overlaps computed from the outlets already loaded, shown until the server answers
+  const localOverlaps = useMemo(() => {
     if (!outlet || !outlet.allOutlets) return [];
 
     const outletsInRadius = findOutletsWithinRadius(
@@ -45,6 +45,36 @@ const OutletDetails = ({ outlet, onClose }) => {
     );
   }, [outlet]);
 
+  // Overlapping catchment areas from the server's precomputed overlap graph, keyed by outlet
+  const [serverOverlaps, setServerOverlaps] = useState(null);
+  const outletId = outlet?.id;
+
+  useEffect(() => {
+    if (outletId === undefined) return;
+    let cancelled = false;
+
+    const fetchOverlaps = async () => {
+      try {
+        const overlaps = await api.getOutletOverlaps(outletId, 5);
+        if (!cancelled) setServerOverlaps({ outletId, overlaps });
+      } catch (error) {
+        // Keep showing the local scan
+        console.error("Error fetching overlapping outlets:", error);
+      }
+    };
+
+    fetchOverlaps();
+
+    return () => {
+      cancelled = true;
+    };
+  }, [outletId]);
+
+  const intersectingOutlets =
+    serverOverlaps && serverOverlaps.outletId === outletId
+      ? serverOverlaps.overlaps
+      : localOverlaps;
+
   // Check for mobile size on resize and adjust top offset based on header height
   useEffect(() => {
     const checkMobileSize = () => {
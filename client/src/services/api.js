@@ -4,6 +4,9 @@ import axios from "axios";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
 
+// Server-side limit on IDs per /outlets/batch request (MAX_BATCH_SIZE)
+const MAX_BATCH_SIZE = 1000;
+
 // Create axios instance with base URL
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -31,16 +34,43 @@ const api = {
     return apiClient.get(`/outlets/${outletId}/operating-hours`);
   },
 
+  getOutletsBatch: async (ids) => {
+    // Split into requests the server accepts, fetched in parallel and merged in order
+    const chunks = [];
+    for (let start = 0; start < ids.length; start += MAX_BATCH_SIZE) {
+      chunks.push(ids.slice(start, start + MAX_BATCH_SIZE));
+    }
+    const results = await Promise.all(
+      chunks.map((chunk) =>
+        // Long ID lists go in a POST body to stay clear of URL length limits
+        chunk.length > 100
+          ? apiClient.post(`/outlets/batch`, { ids: chunk })
+          : apiClient.get(`/outlets/batch`, { params: { ids: chunk.join(",") } })
+      )
+    );
+    return results.flat();
+  },
+
   searchOutlets: async (query) => {
     return apiClient.get(`/outlets/search?query=${encodeURIComponent(query)}`);
   },
 
+  suggestOutlets: async (prefix, limit = 10) => {
+    return apiClient.get(`/outlets/suggest`, { params: { prefix, limit } });
+  },
+
   getNearbyOutlets: async (latitude, longitude, radius = 5.0) => {
     return apiClient.get(`/outlets/nearby`, {
       params: { latitude, longitude, radius },
     });
   },
 
+  getOutletOverlaps: async (outletId, radius = 5.0) => {
+    return apiClient.get(`/outlets/${outletId}/overlaps`, {
+      params: { radius },
+    });
+  },
+
   queryChatbot: async (query, sessionId = null) => {
     const params = { q: query };
     if (sessionId) params.session_id = sessionId;
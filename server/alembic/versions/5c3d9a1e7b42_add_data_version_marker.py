@@ -0,0 +1,32 @@
+"""Add data version marker
+
+Revision ID: 5c3d9a1e7b42
+Revises: 27deb146b100
+Create Date: 2026-10-17 10:12:41.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5c3d9a1e7b42'
+down_revision: Union[str, None] = '27deb146b100'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('data_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Seed the single marker row so concurrent writers only ever UPDATE it
+    op.execute("INSERT INTO data_version (id, version) VALUES (1, 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('data_version')
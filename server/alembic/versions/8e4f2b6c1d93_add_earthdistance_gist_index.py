@@ -0,0 +1,31 @@
+"""Add earthdistance GiST index on outlet coordinates
+
+Revision ID: 8e4f2b6c1d93
+Revises: 5c3d9a1e7b42
+Create Date: 2026-10-17 11:02:57.418870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4f2b6c1d93'
+down_revision: Union[str, None] = '5c3d9a1e7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # earthdistance represents points as cubes on the earth's surface; cube provides the GiST opclass
+    op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+    op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+    # Expression index so earth_box(...) @> ll_to_earth(latitude, longitude) is index-assisted
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_outlets_earth_location ON outlets "
+        "USING gist (ll_to_earth(latitude::float8, longitude::float8))"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_outlets_earth_location")
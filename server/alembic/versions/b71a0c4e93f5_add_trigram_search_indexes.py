@@ -0,0 +1,28 @@
+"""Add trigram search indexes on outlet name and address
+
+Revision ID: b71a0c4e93f5
+Revises: 8e4f2b6c1d93
+Create Date: 2026-10-17 11:48:09.562204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71a0c4e93f5'
+down_revision: Union[str, None] = '8e4f2b6c1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # gin_trgm_ops indexes serve ILIKE '%term%' as well as the <% word-similarity operator
+    op.execute("CREATE INDEX IF NOT EXISTS ix_outlets_name_trgm ON outlets USING gin (name gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_outlets_address_trgm ON outlets USING gin (address gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_outlets_address_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_outlets_name_trgm")
@@ -0,0 +1,49 @@
+"""Add outlet tombstones and updated_at index for delta sync
+
+Revision ID: c4a91f2d7e60
+Revises: b71a0c4e93f5
+Create Date: 2026-10-17 13:05:27.418233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a91f2d7e60'
+down_revision: Union[str, None] = 'b71a0c4e93f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outlet_tombstones',
+        sa.Column('outlet_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('outlet_id')
+    )
+    op.create_index('ix_outlet_tombstones_deleted_at', 'outlet_tombstones', ['deleted_at'])
+    op.create_index('ix_outlets_updated_at', 'outlets', ['updated_at'])
+    # Record every deleted outlet, whichever code path deletes it
+    op.execute("""
+        CREATE OR REPLACE FUNCTION record_outlet_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO outlet_tombstones (outlet_id, deleted_at) VALUES (OLD.id, now())
+            ON CONFLICT (outlet_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER outlets_tombstone AFTER DELETE ON outlets
+        FOR EACH ROW EXECUTE FUNCTION record_outlet_tombstone()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS outlets_tombstone ON outlets")
+    op.execute("DROP FUNCTION IF EXISTS record_outlet_tombstone()")
+    op.drop_index('ix_outlets_updated_at', table_name='outlets')
+    op.drop_index('ix_outlet_tombstones_deleted_at', table_name='outlet_tombstones')
+    op.drop_table('outlet_tombstones')
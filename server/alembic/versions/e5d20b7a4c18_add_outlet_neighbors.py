@@ -0,0 +1,35 @@
+"""Add precomputed outlet nearest-neighbour table
+
+Revision ID: e5d20b7a4c18
+Revises: c4a91f2d7e60
+Create Date: 2026-10-17 14:21:53.870416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d20b7a4c18'
+down_revision: Union[str, None] = 'c4a91f2d7e60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outlet_neighbors',
+        sa.Column('outlet_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), nullable=False),
+        sa.Column('distance_km', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['outlet_id'], ['outlets.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['neighbor_id'], ['outlets.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('outlet_id', 'rank')
+    )
+    op.create_index('ix_outlet_neighbors_neighbor_id', 'outlet_neighbors', ['neighbor_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outlet_neighbors_neighbor_id', table_name='outlet_neighbors')
+    op.drop_table('outlet_neighbors')
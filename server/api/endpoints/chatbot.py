@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Query, BackgroundTasks, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Query, BackgroundTasks, Depends, HTTPException, Request, Response
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 from server.chatbot.gemini_sql_chatbot import GeminiSQLChatbot
-from server.config import DB_CONFIG, GEMINI_API_KEY
+from server.config import CHATBOT_CONFIG, GEMINI_API_KEY
+from server.db.engine import get_async_engine, get_engine
+from server.services.outlet_snapshot import OutletSnapshot, get_outlet_snapshot, outlet_snapshot_store
 
 router = APIRouter(prefix="/chatbot", tags=["chatbot"])
 
@@ -21,11 +24,14 @@ def initialize_chatbot():
     
     print("Starting Gemini SQL Chatbot system initialization...")
     
-    # Create DB connection string from config
-    db_url = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
-    
-    # Initialize the chatbot system
-    chatbot_system = GeminiSQLChatbot(db_url=db_url, gemini_api_key=GEMINI_API_KEY)
+    # Initialize the chatbot system on the shared connection pools, following the
+    # outlet snapshot's data version (re-read every SNAPSHOT_VERSION_CHECK_SECONDS) for answer caching
+    chatbot_system = GeminiSQLChatbot(
+        gemini_api_key=GEMINI_API_KEY,
+        db_engine=get_engine(),
+        async_db_engine=get_async_engine(),
+        data_version=lambda: outlet_snapshot_store.get().version,
+    )
     print("Gemini SQL Chatbot system initialized successfully")
     
     return "Gemini SQL Chatbot system initialized successfully"
@@ -52,15 +58,41 @@ def init_chatbot_endpoint():
     result = initialize_chatbot()
     return {"message": result}
 
+async def run_until_disconnected(request: Request, task: "asyncio.Task", poll_interval: float):
+    """
+    Wait for a task, cancelling it if the client disconnects first.
+    
+    Returns the task's result, or None when the client went away.
+    """
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print("Client disconnected; cancelling chatbot query")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return None
+    finally:
+        # The handler itself was cancelled (e.g. server shutdown)
+        if not task.done():
+            task.cancel()
+
 @router.get("/query", response_model=ChatbotResponse)
-def query_chatbot(
+async def query_chatbot(
+    request: Request,
     q: str = Query(..., description="Question for the chatbot"),
     session_id: Optional[str] = Query(None, description="Session ID for conversation tracking"),
-    chatbot: GeminiSQLChatbot = Depends(get_chatbot_system)
+    chatbot: GeminiSQLChatbot = Depends(get_chatbot_system),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot)
 ):
-    """Query the chatbot with a question."""
-    # Query the chatbot system
-    result = chatbot.query(q, session_id)
+    """Query the chatbot with a question (async end to end, cancelled if the client disconnects)."""
+    # Query the chatbot system at the snapshot's data version
+    task = asyncio.ensure_future(chatbot.query_async(q, session_id, data_version=snapshot.version))
+    result = await run_until_disconnected(request, task, CHATBOT_CONFIG["disconnect_poll_seconds"])
+    if result is None:
+        return Response(status_code=499)  # Client Closed Request; nobody is left to read it
     
     if "relevant_outlets" in result and result["relevant_outlets"]:
         clean_outlets = []
@@ -119,5 +151,9 @@ def get_chatbot_status():
     return {
         "initialized": True,
         "gemini_available": chatbot_system.model is not None,
-        "outlet_count": chatbot_system.outlet_count
+        "outlet_count": chatbot_system.outlet_count,
+        "answer_cache": chatbot_system.answer_cache.stats(),
+        "sql_cache": chatbot_system.result_cache.stats(),
+        "intents": chatbot_system.intent_router.stats() if chatbot_system.intent_router else None,
+        "latency": chatbot_system.latency.stats()
     }
\ No newline at end of file
@@ -1,167 +1,481 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
-from server.db.db_manager import DatabaseManager
-from server.db.models import Outlet, OperatingHours
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import bisect
+import orjson
+from server.db.async_db_manager import AsyncDatabaseManager
 from server.api.models import outlet as outlet_models # Import Pydantic models
-from server.config import DB_CONFIG
-from sqlalchemy.orm import Session
+from server.config import DB_CONFIG, GEO_CONFIG, SYNC_CONFIG
+from server.api.responses import precompressed_response
+from server.services.outlet_snapshot import OutletSnapshot, get_outlet_snapshot
+from server.services.outlet_payload import (
+    get_all_outlets_payload, get_outlet_records, get_outlet_fragments, join_fragments, with_distance,
+)
+from server.services.spatial_index import MAX_DISTANCE_KM, get_spatial_index
+from server.services.marker_clusters import get_marker_clusters
+from server.services.prefix_index import get_prefix_index
+from server.services.opening_hours_index import get_opening_hours_index
+from server.services.overlap_graph import get_overlap_graph, get_overlap_payload, graph_radius_for
 
 router = APIRouter(prefix="/outlets", tags=["outlets"])
 
-# Dependency to get the database session
-def get_db():
-    db_manager = DatabaseManager(**DB_CONFIG)
+DEFAULT_NEARBY_RADIUS_KM = 5.0
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SYNC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Fields selectable with ?fields=; "id" is always returned because it is the pagination key
+OUTLET_FIELDS = ("id", "name", "address", "waze_link", "latitude", "longitude", "operating_hours", "nearest")
+# Fields that are not passed to load_only(): the always-loaded primary key and the relationships
+NON_COLUMN_FIELDS = ("id", "operating_hours", "nearest")
+MARKER_FIELDS = "id,name,latitude,longitude"
+
+# Dependency to get an async database session
+async def get_db():
+    db_manager = AsyncDatabaseManager(**DB_CONFIG)
     try:
-        db_manager.connect()
         yield db_manager
     finally:
-        db_manager.close()
+        await db_manager.close()
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a ?fields= selector into an ordered list of outlet fields (None means every field)."""
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in OUTLET_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(OUTLET_FIELDS)}")
+    return [field for field in OUTLET_FIELDS if field == "id" or field in requested]
+
+def outlet_to_dict(outlet: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """Pick the requested fields from an Outlet row."""
+    data = {}
+    for field in fields:
+        if field == "operating_hours":
+            data[field] = [
+                {
+                    "day_of_week": oh.day_of_week,
+                    "opening_time": oh.opening_time,
+                    "closing_time": oh.closing_time,
+                    "is_closed": oh.is_closed,
+                }
+                for oh in outlet.operating_hours
+            ]
+        elif field == "nearest":
+            data[field] = [
+                {"id": neighbor.neighbor_id, "distance": neighbor.distance_km}
+                for neighbor in outlet.nearest_neighbors
+            ] or None
+        else:
+            value = getattr(outlet, field)
+            # Coordinates are NUMERIC columns; serve them as JSON numbers
+            data[field] = float(value) if isinstance(value, Decimal) else value
+    return data
+
+def pick_fields(record: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Pick the requested fields from a prebuilt outlet record."""
+    return {field: record[field] for field in fields}
+
+def page_response(items: List[Dict[str, Any]], next_cursor: Optional[Any]) -> ORJSONResponse:
+    """Return a page of outlets as a JSON array, advertising the next keyset cursor in X-Next-Cursor."""
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    return ORJSONResponse(content=items, headers=headers)
+
+def fragments_response(fragments: Iterable[bytes], next_cursor: Optional[Any] = None) -> Response:
+    """Return pre-serialized outlets as a JSON array, advertising the next keyset cursor in X-Next-Cursor."""
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    return Response(content=join_fragments(fragments), media_type="application/json", headers=headers)
+
+def parse_search_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    """Parse a search cursor of the form "<rank>:<outlet id>"."""
+    if cursor is None:
+        return None
+    try:
+        rank, outlet_id = cursor.split(":")
+        return float(rank), int(outlet_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_sync_token(high_water: Optional[datetime]) -> str:
+    """Encode a delta sync high-water mark as an opaque token (microseconds since the epoch)."""
+    if high_water is None:
+        return "0"
+    if high_water.tzinfo is None:
+        high_water = high_water.replace(tzinfo=timezone.utc)
+    return str((high_water - SYNC_EPOCH) // timedelta(microseconds=1))
+
+def parse_sync_token(token: Optional[str]) -> Optional[datetime]:
+    """Decode a token from encode_sync_token() (None means a full sync)."""
+    if token is None:
+        return None
+    try:
+        return SYNC_EPOCH + timedelta(microseconds=int(token))
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+def open_outlet_ids(snapshot: OutletSnapshot, open_now: bool, open_at: Optional[datetime]) -> Optional[Set[int]]:
+    """IDs of the outlets open at open_at (or now, with open_now); None when no opening-time filter was requested."""
+    if open_at is not None:
+        return get_opening_hours_index(snapshot).open_outlet_ids(open_at)
+    if open_now:
+        return get_opening_hours_index(snapshot).open_outlet_ids()
+    return None
 
 @router.get("/search", response_model=List[outlet_models.OutletResponse])
-def search_outlets(query: str = Query(..., description="Search by outlet name or address"), db_manager: DatabaseManager = Depends(get_db)):
-    """Search outlets by name or address."""
-    with db_manager:
-        outlets = db_manager.session.query(Outlet).filter(
-            (Outlet.name.ilike(f"%{query}%")) | (Outlet.address.ilike(f"%{query}%"))
-        ).all()
-        return [
-            outlet_models.OutletResponse(
-                id=outlet.id,
-                name=outlet.name,
-                address=outlet.address,
-                waze_link=outlet.waze_link,
-                latitude=outlet.latitude,
-                longitude=outlet.longitude,
-                operating_hours=[
-                    outlet_models.OperatingHoursResponse(
-                        day_of_week=oh.day_of_week,
-                        opening_time=oh.opening_time,
-                        closing_time=oh.closing_time,
-                        is_closed=oh.is_closed,
-                    )
-                    for oh in db_manager.session.query(OperatingHours).filter(OperatingHours.outlet_id == outlet.id).all()
-                ]
-            )
-            for outlet in outlets
-        ]
-
-@router.get("/nearby", response_model=List[outlet_models.OutletResponse])
-def get_nearby_outlets(latitude: float, longitude: float, radius: float = 5.0, db_manager: DatabaseManager = Depends(get_db)):
-    """Find outlets within a certain radius (in kilometers) of a given location."""
-    with db_manager:
-        # Haversine formula to calculate distance
-        query = """
-            SELECT id, name, address, waze_link, latitude, longitude,
-                (6371 * acos(cos(radians(:lat)) * cos(radians(latitude)) *
-                cos(radians(longitude) - radians(:lng)) + sin(radians(:lat)) *
-                sin(radians(latitude)))) AS distance
-            FROM outlets
-            WHERE (6371 * acos(cos(radians(:lat)) * cos(radians(latitude)) *
-                cos(radians(longitude) - radians(:lng)) + sin(radians(:lat)) *
-                sin(radians(latitude)))) <= :radius
-            ORDER BY distance;
-        """
-        outlets = db_manager.session.execute(query, {
-            "lat": latitude,
-            "lng": longitude,
-            "radius": radius,
-        }).fetchall()
-
-        return [
-            outlet_models.OutletResponse(
-                id=outlet.id,
-                name=outlet.name,
-                address=outlet.address,
-                waze_link=outlet.waze_link,
-                latitude=outlet.latitude,
-                longitude=outlet.longitude,
-                operating_hours=[
-                    outlet_models.OperatingHoursResponse(
-                        day_of_week=oh.day_of_week,
-                        opening_time=oh.opening_time,
-                        closing_time=oh.closing_time,
-                        is_closed=oh.is_closed,
-                    )
-                    for oh in db_manager.session.query(OperatingHours).filter(OperatingHours.outlet_id == outlet.id).all()
-                ]
-            )
-            for outlet in outlets
-        ]
+async def search_outlets(
+    query: str = Query(..., min_length=1, description="Search by outlet name or address"),
+    fuzzy: bool = Query(False, description="Typo-tolerant matching by trigram similarity instead of substring"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of outlets to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,latitude,longitude"),
+    open_now: bool = Query(False, description="Only return outlets that are open right now"),
+    open_at: Optional[datetime] = Query(None, description="Only return outlets open at this time (ISO 8601; without an offset, outlet-local time)"),
+    db_manager: AsyncDatabaseManager = Depends(get_db),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Search outlets by name or address, best matches first, with keyset pagination."""
+    selected = parse_fields(fields) or list(OUTLET_FIELDS)
+    open_ids = open_outlet_ids(snapshot, open_now, open_at)
+    if open_ids is not None and not open_ids:
+        return page_response([], None)
+    after = parse_search_cursor(cursor)
+    
+    if fields is None:
+        # Full outlets: only IDs and ranks come from the database, bodies from the fragment cache
+        fragments = get_outlet_fragments(snapshot)
+        hits = await db_manager.search_outlet_ids(
+            query,
+            fuzzy=fuzzy,
+            after=after,
+            limit=limit + 1 if limit is not None else None,
+            outlet_ids=open_ids,
+        )
+        next_cursor = None
+        if limit is not None and len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = f"{hits[-1][1]!r}:{hits[-1][0]}"
+        return fragments_response((fragments[outlet_id] for outlet_id, _ in hits if outlet_id in fragments), next_cursor)
+    
+    columns = [field for field in selected if field not in NON_COLUMN_FIELDS]
+    # Fetch one extra row to learn whether another page exists
+    results = await db_manager.search_outlets(
+        query,
+        fuzzy=fuzzy,
+        columns=columns,
+        include_hours="operating_hours" in selected,
+        after=after,
+        limit=limit + 1 if limit is not None else None,
+        outlet_ids=open_ids,
+        include_nearest="nearest" in selected,
+    )
+    
+    next_cursor = None
+    if limit is not None and len(results) > limit:
+        results = results[:limit]
+        last_outlet, last_rank = results[-1]
+        next_cursor = f"{last_rank!r}:{last_outlet.id}"
+    return page_response([outlet_to_dict(outlet, selected) for outlet, _ in results], next_cursor)
+
+@router.get("/nearby", response_model=List[outlet_models.NearbyOutletResponse])
+async def get_nearby_outlets(
+    latitude: float,
+    longitude: float,
+    radius: Optional[float] = Query(None, gt=0, description="Search radius in kilometers (defaults to 5 km unless k is given)"),
+    k: Optional[int] = Query(None, ge=1, le=100, description="Return the k nearest outlets instead of everything in the radius"),
+    open_now: bool = Query(False, description="Only return outlets that are open right now"),
+    open_at: Optional[datetime] = Query(None, description="Only return outlets open at this time (ISO 8601; without an offset, outlet-local time)"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Find outlets within a radius (in kilometers) of a location, or its k nearest outlets, ordered by distance."""
+    if k is None and radius is None:
+        radius = DEFAULT_NEARBY_RADIUS_KM
+    open_ids = open_outlet_ids(snapshot, open_now, open_at)
+    search_radius, search_k = radius, k
+    if open_ids is not None and k is not None:
+        # The k nearest are picked after the opening-time filter, so search the whole radius
+        search_radius, search_k = radius if radius is not None else MAX_DISTANCE_KM, None
+    
+    if GEO_CONFIG["nearby_backend"] == "sql":
+        # Bounding-box prefilter on the earthdistance GiST index, exact distance check in SQL
+        async with AsyncDatabaseManager(**DB_CONFIG) as db_manager:
+            hits = await db_manager.find_nearby_outlets(latitude, longitude, radius_km=search_radius, k=search_k)
+    else:
+        index = get_spatial_index(snapshot)
+        if search_k is not None:
+            hits = index.nearest(latitude, longitude, search_k, max_radius_km=search_radius)
+        else:
+            hits = index.within_radius(latitude, longitude, search_radius)
+    
+    if open_ids is not None:
+        hits = [(outlet_id, distance) for outlet_id, distance in hits if outlet_id in open_ids][:k]
+    fragments = get_outlet_fragments(snapshot)
+    return fragments_response(
+        with_distance(fragments[outlet_id], distance)
+        for outlet_id, distance in hits
+        if outlet_id in fragments
+    )
+
+def parse_lat_lng(value: str, name: str) -> Tuple[float, float]:
+    """Parse a "latitude,longitude" query parameter."""
+    try:
+        latitude, longitude = (float(part) for part in value.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be formatted as 'latitude,longitude'")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise HTTPException(status_code=400, detail=f"{name} is out of range")
+    return latitude, longitude
+
+@router.get("/in-bounds", response_model=outlet_models.InBoundsResponse)
+async def get_outlets_in_bounds(
+    sw: str = Query(..., description="South-west corner of the viewport as 'latitude,longitude'"),
+    ne: str = Query(..., description="North-east corner of the viewport as 'latitude,longitude'"),
+    zoom: int = Query(..., ge=0, le=22, description="Map zoom level"),
+    fields: str = Query(MARKER_FIELDS, description="Comma-separated fields to return for individual outlets"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """
+    Return the outlets inside a map viewport.
+    
+    At low zoom levels outlets are grouped into precomputed grid clusters
+    (count + centroid); outlets alone in their cell are still returned individually.
+    """
+    south, west = parse_lat_lng(sw, "sw")
+    north, east = parse_lat_lng(ne, "ne")
+    if south > north:
+        raise HTTPException(status_code=400, detail="sw must be south of ne")
+    selected = parse_fields(fields)
+    
+    clusters_index = get_marker_clusters(snapshot)
+    clustered = zoom <= clusters_index.max_zoom
+    if clustered:
+        clusters, outlet_ids = clusters_index.in_bounds(zoom, south, west, north, east)
+    else:
+        clusters, outlet_ids = [], get_spatial_index(snapshot).within_bounds(south, west, north, east)
+    
+    records = get_outlet_records(snapshot)
+    return ORJSONResponse({
+        "zoom": zoom,
+        "clustered": clustered,
+        "outlets": [pick_fields(records[outlet_id], selected) for outlet_id in outlet_ids],
+        "clusters": clusters,
+    })
+
+@router.get("/suggest", response_model=List[outlet_models.OutletSuggestion])
+async def suggest_outlets(
+    prefix: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Autocomplete outlet names from an in-memory prefix index over names, areas and address words."""
+    return [
+        outlet_models.OutletSuggestion(id=outlet_id, name=name)
+        for outlet_id, name in get_prefix_index(snapshot).suggest(prefix, limit)
+    ]
+
+@router.get("/open", response_model=List[outlet_models.OutletOpenStatus])
+async def get_open_outlets(
+    at: Optional[datetime] = Query(None, description="Moment to check (ISO 8601; without an offset, outlet-local time). Defaults to now"),
+    include_closed: bool = Query(False, description="Also list closed outlets with their next opening time"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """List the outlets open at a moment with their next closing time (and, optionally, closed ones with their next opening time)."""
+    statuses = get_opening_hours_index(snapshot).statuses(at)
+    return ORJSONResponse([
+        {
+            "id": outlet.id,
+            "name": outlet.name,
+            "is_open": statuses[outlet.id].is_open,
+            "opens_at": statuses[outlet.id].opens_at,
+            "closes_at": statuses[outlet.id].closes_at,
+        }
+        for outlet in snapshot.outlets
+        if include_closed or statuses[outlet.id].is_open
+    ])
+
+@router.get("/overlaps", response_model=outlet_models.OutletOverlapGraph)
+async def get_overlap_adjacency(
+    request: Request,
+    radius: float = Query(DEFAULT_NEARBY_RADIUS_KM, gt=0, description="Catchment radius in kilometers (one of the precomputed radii)"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Bulk export of the precomputed catchment-overlap graph as an adjacency list, precompressed and ETagged."""
+    if radius not in GEO_CONFIG["overlap_radii_km"]:
+        allowed = ", ".join(f"{r:g}" for r in GEO_CONFIG["overlap_radii_km"])
+        raise HTTPException(status_code=400, detail=f"radius must be one of the precomputed radii: {allowed}")
+    return precompressed_response(request, get_overlap_payload(snapshot, radius))
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated list of outlet IDs."""
+    try:
+        return [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+
+def batch_response(ids: List[int], fields: Optional[str], snapshot: OutletSnapshot) -> ORJSONResponse:
+    """Resolve many outlets at once from the snapshot, in request order, skipping duplicates and unknown IDs."""
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} ids per request")
+    outlet_ids = [outlet_id for outlet_id in dict.fromkeys(ids) if outlet_id in snapshot.by_id]
+    if fields is None:
+        fragments = get_outlet_fragments(snapshot)
+        return fragments_response(fragments[outlet_id] for outlet_id in outlet_ids)
+    selected = parse_fields(fields)
+    records = get_outlet_records(snapshot)
+    return page_response([pick_fields(records[outlet_id], selected) for outlet_id in outlet_ids], None)
+
+@router.get("/batch", response_model=List[outlet_models.OutletResponse])
+async def get_outlets_batch(
+    ids: str = Query(..., description="Comma-separated outlet IDs, e.g. 1,2,3"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,latitude,longitude"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Retrieve several outlets with their operating hours in one request."""
+    return batch_response(parse_ids(ids), fields, snapshot)
+
+@router.post("/batch", response_model=List[outlet_models.OutletResponse])
+async def post_outlets_batch(
+    request: outlet_models.OutletBatchRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,latitude,longitude"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Retrieve several outlets in one request, for ID lists too long for a query string."""
+    return batch_response(request.ids, fields, snapshot)
+
+@router.get("/changes", response_model=outlet_models.OutletChanges)
+async def get_outlet_changes(
+    since: Optional[str] = Query(None, description="Token from the previous sync; omit for a full sync"),
+    db_manager: AsyncDatabaseManager = Depends(get_db),
+):
+    """
+    Outlets created, modified or deleted since a sync token.
+    
+    Without a token every outlet is returned. Each response carries the token for
+    the next call. Syncs look back a little past the token, so an outlet may be
+    reported again; clients should apply changes idempotently (upsert by ID).
+    """
+    since_at = parse_sync_token(since)
+    high_water, outlets, deleted_ids = await db_manager.get_changes(
+        since_at, overlap=timedelta(seconds=SYNC_CONFIG["overlap_seconds"]))
+    return ORJSONResponse(content={
+        "token": encode_sync_token(high_water),
+        "upserted": [outlet_to_dict(outlet, OUTLET_FIELDS) for outlet in outlets],
+        "deleted": deleted_ids,
+    })
+
+@router.get("/version")
+async def get_outlets_version(snapshot: OutletSnapshot = Depends(get_outlet_snapshot)):
+    """Cheap probe for the current outlet data version and the ETag of GET /outlets."""
+    payload = get_all_outlets_payload(snapshot)
+    return {"version": snapshot.version, "etag": payload.etag, "outlet_count": len(snapshot.outlets)}
+
+async def stream_outlet_records(fields: Sequence[str], after_id: Optional[int], outlet_ids: Optional[Set[int]],
+                                limit: Optional[int], ndjson: bool) -> AsyncIterator[bytes]:
+    """Read outlets from the database chunk by chunk and write each chunk out as soon as it is serialized."""
+    columns = [field for field in fields if field not in NON_COLUMN_FIELDS]
+    separator = b"\n" if ndjson else b","
+    first = True
+    if not ndjson:
+        yield b"["
+    async with AsyncDatabaseManager(**DB_CONFIG) as db_manager:
+        async for outlets in db_manager.stream_outlets(
+            columns=columns if len(fields) < len(OUTLET_FIELDS) else None,
+            include_hours="operating_hours" in fields,
+            after_id=after_id,
+            outlet_ids=outlet_ids,
+            limit=limit,
+            chunk_size=STREAM_CHUNK_SIZE,
+            include_nearest="nearest" in fields,
+        ):
+            records = [orjson.dumps(outlet_to_dict(outlet, fields)) for outlet in outlets]
+            if ndjson:
+                yield b"".join(record + separator for record in records)
+            else:
+                yield (b"" if first else separator) + separator.join(records)
+            first = False
+    if not ndjson:
+        yield b"]"
 
 @router.get("/", response_model=List[outlet_models.OutletResponse])
-def get_all_outlets(db_manager: DatabaseManager = Depends(get_db)):
-    """Retrieve all outlets with their operating hours."""
-    with db_manager:
-        outlets = db_manager.session.query(Outlet).all()
-        # Use list comprehension to construct OutletResponse objects
-        return [
-            outlet_models.OutletResponse(
-                id=outlet.id,
-                name=outlet.name,
-                address=outlet.address,
-                waze_link=outlet.waze_link,
-                latitude=outlet.latitude,
-                longitude=outlet.longitude,
-                operating_hours=[
-                    outlet_models.OperatingHoursResponse(
-                        day_of_week=oh.day_of_week,
-                        opening_time=oh.opening_time,
-                        closing_time=oh.closing_time,
-                        is_closed=oh.is_closed,
-                    )
-                    for oh in db_manager.session.query(OperatingHours).filter(OperatingHours.outlet_id == outlet.id).all()
-                ]
-            )
-            for outlet in outlets
-        ]
+async def get_all_outlets(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of outlets to return"),
+    cursor: Optional[int] = Query(None, description="Return outlets after this ID (the X-Next-Cursor of the previous page)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,latitude,longitude"),
+    open_now: bool = Query(False, description="Only return outlets that are open right now"),
+    open_at: Optional[datetime] = Query(None, description="Only return outlets open at this time (ISO 8601; without an offset, outlet-local time)"),
+    stream: bool = Query(False, description="Stream the outlets straight from the database as a JSON array"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """
+    Retrieve all outlets with their operating hours.
+    
+    Without paging, field selection or opening-time filters the full precompressed
+    payload is served (answering If-None-Match with 304). With limit/cursor the
+    outlets are paged by ID, and fields= limits each outlet to the listed fields.
+    
+    With stream=1 or Accept: application/x-ndjson the outlets are read from the
+    database through a server-side cursor and streamed as a JSON array or as
+    newline-delimited JSON, so memory use and time to first byte stay flat.
+    """
+    open_ids = open_outlet_ids(snapshot, open_now, open_at)
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    if stream or ndjson:
+        selected = parse_fields(fields) or list(OUTLET_FIELDS)
+        return StreamingResponse(
+            stream_outlet_records(selected, cursor, open_ids, limit, ndjson),
+            media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+        )
+    if limit is None and cursor is None and fields is None and open_ids is None:
+        return precompressed_response(request, get_all_outlets_payload(snapshot))
+    
+    selected = parse_fields(fields) or list(OUTLET_FIELDS)
+    outlets = snapshot.outlets if open_ids is None else [outlet for outlet in snapshot.outlets if outlet.id in open_ids]
+    start = bisect.bisect_right(outlets, cursor, key=lambda outlet: outlet.id) if cursor is not None else 0
+    end = start + limit if limit is not None else len(outlets)
+    page = outlets[start:end]
+    next_cursor = page[-1].id if page and end < len(outlets) else None
+    if fields is None:
+        fragments = get_outlet_fragments(snapshot)
+        return fragments_response((fragments[outlet.id] for outlet in page), next_cursor)
+    records = get_outlet_records(snapshot)
+    return page_response([pick_fields(records[outlet.id], selected) for outlet in page], next_cursor)
 
 @router.get("/{outlet_id}", response_model=outlet_models.OutletResponse)
-def get_outlet(outlet_id: int, db_manager: DatabaseManager = Depends(get_db)):
+async def get_outlet(outlet_id: int, snapshot: OutletSnapshot = Depends(get_outlet_snapshot)):
     """Retrieve details of a specific outlet by ID."""
-    with db_manager:
-        outlet = db_manager.session.query(Outlet).filter(Outlet.id == outlet_id).first()
-        if not outlet:
-            raise HTTPException(status_code=404, detail="Outlet not found")
-        # Construct OutletResponse object
-        return outlet_models.OutletResponse(
-            id=outlet.id,
-            name=outlet.name,
-            address=outlet.address,
-            waze_link=outlet.waze_link,
-            latitude=outlet.latitude,
-            longitude=outlet.longitude,
-            operating_hours=[
-                outlet_models.OperatingHoursResponse(
-                    day_of_week=oh.day_of_week,
-                    opening_time=oh.opening_time,
-                    closing_time=oh.closing_time,
-                    is_closed=oh.is_closed,
-                )
-                for oh in db_manager.session.query(OperatingHours).filter(OperatingHours.outlet_id == outlet.id).all()
-            ]
-        )
+    fragment = get_outlet_fragments(snapshot).get(outlet_id)
+    if not fragment:
+        raise HTTPException(status_code=404, detail="Outlet not found")
+    return Response(content=fragment, media_type="application/json")
+
+@router.get("/{outlet_id}/overlaps", response_model=List[outlet_models.NearbyOutletResponse])
+async def get_outlet_overlaps(
+    outlet_id: int,
+    radius: float = Query(DEFAULT_NEARBY_RADIUS_KM, gt=0, description="Catchment radius in kilometers"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """Outlets whose catchment area overlaps this outlet's (no more than radius km away), nearest first."""
+    if outlet_id not in snapshot.by_id:
+        raise HTTPException(status_code=404, detail="Outlet not found")
+    graph_radius = graph_radius_for(radius)
+    if graph_radius is None:
+        raise HTTPException(status_code=400, detail=f"radius must not exceed {max(GEO_CONFIG['overlap_radii_km']):g} km")
+    
+    fragments = get_outlet_fragments(snapshot)
+    return fragments_response(
+        with_distance(fragments[neighbor_id], distance)
+        for neighbor_id, distance in get_overlap_graph(snapshot, graph_radius).neighbors(outlet_id, radius)
+    )
 
 @router.get("/{outlet_id}/operating-hours", response_model=List[outlet_models.OperatingHoursResponse])
-def get_outlet_operating_hours(outlet_id: int, db_manager: DatabaseManager = Depends(get_db)):
+async def get_outlet_operating_hours(outlet_id: int, snapshot: OutletSnapshot = Depends(get_outlet_snapshot)):
     """Retrieve operating hours for a specific outlet."""
-    with db_manager:
-        # First check if the outlet exists
-        outlet = db_manager.session.query(Outlet).filter(Outlet.id == outlet_id).first()
-        if not outlet:
-            raise HTTPException(status_code=404, detail="Outlet not found")
-            
-        # Get all operating hours for this outlet
-        operating_hours = db_manager.session.query(OperatingHours).filter(
-            OperatingHours.outlet_id == outlet_id
-        ).all()
-        
-        # Transform to response model
-        return [
-            outlet_models.OperatingHoursResponse(
-                day_of_week=oh.day_of_week,
-                opening_time=oh.opening_time,
-                closing_time=oh.closing_time,
-                is_closed=oh.is_closed,
-            )
-            for oh in operating_hours
-        ]
\ No newline at end of file
+    record = get_outlet_records(snapshot).get(outlet_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Outlet not found")
+    return ORJSONResponse(record["operating_hours"])
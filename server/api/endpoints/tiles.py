@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Path, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from server.config import TILE_CONFIG
+from server.api.responses import versioned_response
+from server.services.outlet_snapshot import OutletSnapshot, get_outlet_snapshot
+from server.services.vector_tiles import get_vector_tiles
+
+router = APIRouter(prefix="/tiles", tags=["tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+@router.get("/{z}/{x}/{y}.mvt")
+async def get_outlet_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=TILE_CONFIG["max_zoom"], description="Zoom level"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row (XYZ scheme, 0 at the top)"),
+    snapshot: OutletSnapshot = Depends(get_outlet_snapshot),
+):
+    """
+    Outlet markers as a Mapbox Vector Tile (layer "outlets").
+    
+    Up to zoom 11 features are marker clusters with "cluster" and "point_count"
+    properties (single-outlet cells carry the outlet instead); above that every
+    feature is an outlet with "id" and "name".
+    """
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    tiles = get_vector_tiles(snapshot)
+    tile = tiles.cached(z, x, y)
+    if tile is None:
+        # Disk reads and rendering stay off the event loop
+        tile = await run_in_threadpool(tiles.get, z, x, y)
+    return versioned_response(request, tile, f'"{tiles.cache_key}"', snapshot.version, MVT_MEDIA_TYPE)
@@ -1,5 +1,5 @@
 from fastapi import FastAPI
-from server.api.endpoints import outlet, chatbot
+from server.api.endpoints import outlet, chatbot, tiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import subprocess
@@ -11,6 +11,7 @@ app = FastAPI()
 # Include routers
 app.include_router(outlet.router)
 app.include_router(chatbot.router)
+app.include_router(tiles.router)
 
 default_origins = "http://localhost:3000,https://subway-outlets-frontend.onrender.com"
 origins_str = os.getenv("CORS_ORIGINS", default_origins)
@@ -55,6 +56,28 @@ async def startup_event():
                 print("Data population completed")
             else:
                 print("Database already has data, skipping scraper")
+                # Databases migrated before the nearest-neighbour table existed have it empty
+                from server.db.models import OutletNeighbor
+                if db_manager.session.query(OutletNeighbor).first() is None:
+                    from server.services.outlet_neighbors import rebuild_outlet_neighbors
+                    rebuild_outlet_neighbors(db_manager)
+                    print("Built the outlet nearest-neighbour table")
+        
+        # Warm the in-memory outlet snapshot so the first request doesn't pay for it
+        from server.services.outlet_snapshot import outlet_snapshot_store
+        snapshot = outlet_snapshot_store.get()
+        print(f"Loaded outlet snapshot v{snapshot.version} with {len(snapshot.outlets)} outlets")
+        
+        # Precompute the catchment-overlap graphs for the configured radii
+        from server.config import GEO_CONFIG
+        from server.services.overlap_graph import get_overlap_graph
+        for radius in GEO_CONFIG["overlap_radii_km"]:
+            get_overlap_graph(snapshot, radius)
+        
+        # Render the low-zoom (clustered) vector tiles, or load them from the disk cache
+        from server.services.vector_tiles import get_vector_tiles
+        tile_count = get_vector_tiles(snapshot).warm()
+        print(f"Warmed {tile_count} vector tiles")
                 
         # Initialize the chatbot at startup
         from server.api.endpoints.chatbot import initialize_chatbot
@@ -65,6 +88,19 @@ async def startup_event():
         print("Detailed traceback:")
         traceback.print_exc()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Release pooled database connections
+    from server.db.engine import dispose_engines, dispose_async_engines
+    dispose_engines()
+    await dispose_async_engines()
+
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the Subway Outlet API"}
\ No newline at end of file
+    return {"message": "Welcome to the Subway Outlet API"}
+
+@app.get("/health/db-pool")
+def db_pool_stats():
+    """Report shared connection pool occupancy and checkout wait statistics."""
+    from server.db.engine import get_pool_stats
+    return get_pool_stats()
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import time
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import time, datetime
 
 class OperatingHoursResponse(BaseModel):
     day_of_week: str
@@ -18,9 +18,52 @@ class OutletBase(BaseModel):
 class OutletCreate(OutletBase):
     pass
 
+class OutletNeighborResponse(BaseModel):
+    id: int
+    distance: float  # Great-circle distance in kilometers
+
 class OutletResponse(OutletBase):
     id: int
     operating_hours: List[OperatingHoursResponse]
+    nearest: Optional[List[OutletNeighborResponse]] = None  # Closest other outlets, nearest first (null until computed)
 
     class Config:
         from_attributes = True
+
+class NearbyOutletResponse(OutletResponse):
+    distance: float  # Great-circle distance from the query point, in kilometers
+
+class OutletCluster(BaseModel):
+    latitude: float  # Centroid of the clustered outlets
+    longitude: float
+    count: int
+
+class InBoundsResponse(BaseModel):
+    zoom: int
+    clustered: bool
+    outlets: List[Dict[str, Any]]  # Individual outlets, limited to the requested fields
+    clusters: List[OutletCluster]
+
+class OutletSuggestion(BaseModel):
+    id: int
+    name: str
+
+class OutletOpenStatus(BaseModel):
+    id: int
+    name: str
+    is_open: bool
+    opens_at: Optional[datetime]  # Next opening time, when closed
+    closes_at: Optional[datetime]  # Next closing time, when open (null if open around the clock)
+
+class OutletOverlapGraph(BaseModel):
+    version: int
+    radius: float
+    adjacency: Dict[int, List[Tuple[int, float]]]  # Outlet ID -> [neighbor ID, distance in km], nearest first
+
+class OutletBatchRequest(BaseModel):
+    ids: List[int]
+
+class OutletChanges(BaseModel):
+    token: str  # Pass as ?since= on the next sync
+    upserted: List[OutletResponse]  # Outlets created or modified since the given token
+    deleted: List[int]  # IDs of outlets deleted since the given token
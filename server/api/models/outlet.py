@@ -1 +1,36 @@
-from .base import OutletBase, OutletCreate, OutletResponse, OperatingHoursResponse
\ No newline at end of file
+from .base import (
+    OutletBase, OutletCreate, OutletResponse, OperatingHoursResponse, NearbyOutletResponse,
+    OutletCluster, InBoundsResponse, OutletSuggestion, OutletOpenStatus, OutletOverlapGraph,
+    OutletBatchRequest, OutletChanges, OutletNeighborResponse,
+)
+from typing import List, Optional
+from server.db.models import Outlet, OperatingHours
+
+def to_operating_hours_response(oh: OperatingHours) -> OperatingHoursResponse:
+    """Convert an OperatingHours row to its response model."""
+    return OperatingHoursResponse(
+        day_of_week=oh.day_of_week,
+        opening_time=oh.opening_time,
+        closing_time=oh.closing_time,
+        is_closed=oh.is_closed,
+    )
+
+def to_outlet_neighbors(outlet: Outlet) -> Optional[List[OutletNeighborResponse]]:
+    """Convert an Outlet's precomputed nearest neighbours (None when none are stored)."""
+    return [
+        OutletNeighborResponse(id=neighbor.neighbor_id, distance=neighbor.distance_km)
+        for neighbor in outlet.nearest_neighbors
+    ] or None
+
+def to_outlet_response(outlet: Outlet, include_nearest: bool = False) -> OutletResponse:
+    """Convert an Outlet (with operating_hours, and nearest_neighbors if requested, already loaded) to its response model."""
+    return OutletResponse(
+        id=outlet.id,
+        name=outlet.name,
+        address=outlet.address,
+        waze_link=outlet.waze_link,
+        latitude=outlet.latitude,
+        longitude=outlet.longitude,
+        operating_hours=[to_operating_hours_response(oh) for oh in outlet.operating_hours],
+        nearest=to_outlet_neighbors(outlet) if include_nearest else None,
+    )
@@ -0,0 +1,76 @@
+from typing import Dict, Optional
+from fastapi import Request, Response
+from server.services.outlet_payload import PrecompressedPayload
+
+# Clients may cache the body but must revalidate it with If-None-Match on every use
+PAYLOAD_CACHE_CONTROL = "no-cache"
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into a {coding: q-value} map."""
+    encodings = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding.strip().lower()] = q
+    return encodings
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def precompressed_response(request: Request, payload: PrecompressedPayload) -> Response:
+    """
+    Serve a precompressed payload, honouring If-None-Match and Accept-Encoding.
+    
+    Returns 304 with no body when the client already holds the current version;
+    otherwise picks brotli, then gzip, then identity based on what the client accepts.
+    """
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": PAYLOAD_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        "X-Data-Version": str(payload.version),
+    }
+    if _etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+    
+    accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+    wildcard = accepted.get("*", 0)
+    if payload.brotli_body is not None and accepted.get("br", wildcard) > 0:
+        headers["Content-Encoding"] = "br"
+        body = payload.brotli_body
+    elif accepted.get("gzip", wildcard) > 0:
+        headers["Content-Encoding"] = "gzip"
+        body = payload.gzip_body
+    else:
+        body = payload.body
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def versioned_response(request: Request, body: bytes, etag: str, version: int, media_type: str) -> Response:
+    """Serve a body that only changes with the data version, returning 304 when the client already holds it."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": PAYLOAD_CACHE_CONTROL,
+        "X-Data-Version": str(version),
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
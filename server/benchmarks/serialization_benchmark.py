@@ -0,0 +1,96 @@
+"""
+Per-outlet JSON serialization cost of the outlet endpoints, before and after the fast paths.
+
+"before" replays what FastAPI does for a response_model endpoint that returns
+OutletResponse objects: dump each model to a dict, validate the list against
+the response model, serialize it in JSON mode and render it with json.dumps.
+"records" picks fields from the prebuilt per-snapshot records and renders them
+with orjson (used when ?fields= selects a subset). "fragments" concatenates the
+cached per-outlet JSON fragments, as full-outlet list responses do.
+
+Usage (from the repository root):
+    python -m server.benchmarks.serialization_benchmark --outlets 5000 --repeat 20
+"""
+import argparse
+import json
+import time
+from datetime import time as dtime
+from types import MappingProxyType
+from typing import Callable, List
+import orjson
+from pydantic import TypeAdapter
+from server.api.models.outlet import OutletResponse, OperatingHoursResponse
+from server.services.outlet_snapshot import OutletSnapshot
+from server.services.outlet_payload import get_outlet_records, get_outlet_fragments, join_fragments
+from server.api.endpoints.outlet import OUTLET_FIELDS, pick_fields
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def build_snapshot(outlet_count: int) -> OutletSnapshot:
+    """Build a snapshot of synthetic outlets, each with a week of operating hours."""
+    outlets = tuple(
+        OutletResponse(
+            id=i,
+            name=f"Subway Outlet {i}",
+            address=f"Lot {i}, Jalan Bukit Bintang, Bukit Bintang, Kuala Lumpur",
+            waze_link=f"https://www.waze.com/live-map/directions?to=ll.{3 + i / 1e4},{101 + i / 1e4}",
+            latitude=3.0 + i / 1e4,
+            longitude=101.0 + i / 1e4,
+            operating_hours=[
+                OperatingHoursResponse(day_of_week=day, opening_time=dtime(8), closing_time=dtime(22), is_closed=False)
+                for day in DAYS
+            ],
+        )
+        for i in range(1, outlet_count + 1)
+    )
+    return OutletSnapshot(version=1, outlets=outlets, by_id=MappingProxyType({o.id: o for o in outlets}), loaded_at=time.time())
+
+def per_outlet_us(fn: Callable[[], bytes], outlet_count: int, repeat: int) -> float:
+    """Best-of-repeat wall time of fn, in microseconds per outlet."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / outlet_count * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--outlets", type=int, default=5000, help="Number of synthetic outlets")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(args.outlets)
+    adapter = TypeAdapter(List[OutletResponse])
+    fields = list(OUTLET_FIELDS)
+
+    def before() -> bytes:
+        content = [outlet.model_dump() for outlet in snapshot.outlets]
+        validated = adapter.validate_python(content)
+        return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+    def after() -> bytes:
+        records = get_outlet_records(snapshot)
+        return orjson.dumps([pick_fields(records[outlet.id], fields) for outlet in snapshot.outlets])
+
+    def concatenated() -> bytes:
+        fragments = get_outlet_fragments(snapshot)
+        return join_fragments(fragments[outlet.id] for outlet in snapshot.outlets)
+
+    build_start = time.perf_counter()
+    get_outlet_fragments(snapshot)
+    build_us = (time.perf_counter() - build_start) / args.outlets * 1e6
+
+    expected = json.loads(before())
+    assert json.loads(after()) == expected and json.loads(concatenated()) == expected, "fast path output differs"
+    before_us = per_outlet_us(before, args.outlets, args.repeat)
+    after_us = per_outlet_us(after, args.outlets, args.repeat)
+    fragments_us = per_outlet_us(concatenated, args.outlets, args.repeat)
+    print(f"{args.outlets} outlets, best of {args.repeat}")
+    print(f"  response_model path:  {before_us:8.2f} us/outlet")
+    print(f"  orjson + records:     {after_us:8.2f} us/outlet ({before_us / after_us:.1f}x faster)")
+    print(f"  cached fragments:     {fragments_us:8.2f} us/outlet ({before_us / fragments_us:.1f}x faster)")
+    print(f"  records + fragments build (once per data version): {build_us:.2f} us/outlet")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from typing import Any, Dict, Hashable, Optional
+from server.chatbot.versioned_cache import CountingTTLCache, VersionedCache
+
+# Words that ask for the same thing; each maps to the form used in the cache key
+SYNONYMS = {
+    "store": "outlet",
+    "stores": "outlets",
+    "shop": "outlet",
+    "shops": "outlets",
+    "branch": "outlet",
+    "branches": "outlets",
+    "restaurant": "outlet",
+    "restaurants": "outlets",
+    "location": "outlet",
+    "locations": "outlets",
+    "nearest": "closest",
+    "nearby": "near",
+    "sunday": "sundays",
+    "saturday": "saturdays",
+    "weekend": "weekends",
+    "whats": "what is",
+    "wheres": "where is",
+    "hows": "how is",
+    "whens": "when is",
+    "u": "you",
+}
+# Politeness that doesn't change the answer
+FILLER_WORDS = {"please", "pls", "plz", "kindly", "hi", "hello", "hey", "thanks", "thank"}
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[^\w]+")
+
+def normalize_question(question: str) -> str:
+    """
+    Reduce a question to a canonical form for answer caching.
+
+    Casing, punctuation and whitespace are dropped, synonyms such as
+    "stores"/"outlets" are folded together and filler words removed, so
+    "How many Subway stores are in Bangsar?" and "how many subway outlets
+    are in bangsar" share a key.
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _APOSTROPHES.sub("", text)  # "what's" -> "whats"
+    words = []
+    for word in _NON_WORD.sub(" ", text).split():
+        if word in FILLER_WORDS:
+            continue
+        words.extend(SYNONYMS.get(word, word).split())
+    return " ".join(words)
+
+class AnswerCache(VersionedCache):
+    """
+    Bounded LRU + TTL cache of chatbot answers, shared across sessions.
+
+    Keys combine the normalized question with the outlet data version, so a
+    data refresh makes every earlier answer unreachable; the first lookup at a
+    new version also drops them to free memory.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 3600):
+        super().__init__(CountingTTLCache(maxsize=maxsize, ttl=ttl_seconds))
+
+    @staticmethod
+    def key(question: str, data_version: int) -> Hashable:
+        """Cache key of a question at a data version."""
+        return (data_version, normalize_question(question))
+
+    def get(self, question: str, data_version: int) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for a question at a data version, or None."""
+        return self._get(self.key(question, data_version), data_version)
+
+    def put(self, question: str, data_version: int, answer: Dict[str, Any]):
+        """Cache an answer, unless the data has moved on since it was computed."""
+        self._put(self.key(question, data_version), data_version, answer)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                **self._counter_stats(),
+            }
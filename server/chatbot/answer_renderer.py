@@ -0,0 +1,189 @@
+from datetime import time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+from server.chatbot.intent_router import DAYS, IntentMatch
+
+SHAPES = ("empty", "count", "outlet", "outlet_list", "hours")
+
+# Columns the renderer knows how to present; rows with anything else are left to Gemini
+OUTLET_COLUMNS = {
+    "id", "name", "address", "waze_link", "latitude", "longitude", "distance_km", "distance",
+    "day_of_week", "opening_time", "closing_time", "is_closed", "is_open_now", "raw_operating_hours",
+}
+_COUNT_COLUMN_HINTS = ("count", "total", "number")
+# Template lists fetched one row past the limit; longer results are cut and say so
+TRUNCATED_LIST_INTENTS = ("open_now", "open_on_day")
+
+def format_time(value: Any) -> str:
+    """10:00 AM style for time values; anything else as text."""
+    if isinstance(value, time):
+        suffix = "AM" if value.hour < 12 else "PM"
+        return f"{value.hour % 12 or 12}:{value.minute:02d} {suffix}"
+    return str(value)
+
+def _plural(count: int, word: str) -> str:
+    return f"{count} {word}" if count == 1 else f"{count} {word}s"
+
+def _hours_text(row: Dict[str, Any]) -> Optional[str]:
+    """"10:00 AM – 10:00 PM", "Closed", or None when the row has no usable hours."""
+    if row.get("is_closed"):
+        return "Closed"
+    if row.get("opening_time") is None or row.get("closing_time") is None:
+        return None
+    return f"{format_time(row['opening_time'])} – {format_time(row['closing_time'])}"
+
+class AnswerRenderer:
+    """
+    Markdown answers for result shapes that don't need an LLM to phrase them.
+
+    Recognised shapes are "empty" (no rows), "count" (one numeric count),
+    "outlet" (one outlet, optionally with its hours for a day or right now),
+    "outlet_list" (a few outlets) and "hours" (one outlet's weekly hours).
+    render() returns None for anything else, or for shapes that are turned off,
+    and the caller asks Gemini instead. Outlets selected by Gemini-written SQL
+    are also left to Gemini, since only the SQL knows why they were picked
+    ("open now", "has a drive-through", ...). Their counts are only rendered
+    when the column is a count of outlets (outlet_count, total_outlets, ...).
+    """
+
+    def __init__(self, shapes: Iterable[str] = SHAPES, list_max_rows: int = 10):
+        self.shapes = set(shapes)
+        self.list_max_rows = list_max_rows
+
+    def shape(self, rows: List[Dict[str, Any]]) -> Optional[str]:
+        """Name of the shape of a result, or None if it isn't one of the simple ones."""
+        if not rows:
+            return "empty"
+        columns = set(rows[0].keys())
+        if len(rows) == 1 and len(columns) == 1 and "name" not in columns:
+            (column, value), = rows[0].items()
+            is_integral = isinstance(value, int) or (isinstance(value, Decimal) and value == value.to_integral_value())
+            if is_integral and not isinstance(value, bool) and any(hint in column.lower() for hint in _COUNT_COLUMN_HINTS):
+                return "count"
+            return None
+        if "name" not in columns or not columns <= OUTLET_COLUMNS:
+            return None
+        names = {row["name"] for row in rows}
+        if len(rows) > 1 and len(names) == 1 and {"day_of_week", "opening_time", "closing_time"} <= columns:
+            return "hours"
+        if len(rows) == 1:
+            return "outlet"
+        if len(names) == len(rows) and len(rows) <= self.list_max_rows:
+            return "outlet_list"
+        return None
+
+    def render(self, rows: List[Dict[str, Any]], intent: Optional[IntentMatch] = None) -> Optional[str]:
+        """Markdown answer for a result, or None when it should be phrased by Gemini."""
+        truncated = bool(intent and intent.intent in TRUNCATED_LIST_INTENTS and len(rows) > self.list_max_rows)
+        if truncated:
+            rows = rows[:self.list_max_rows]
+        shape = self.shape(rows)
+        if shape is None or shape not in self.shapes:
+            return None
+        if intent is None and shape in ("outlet", "outlet_list"):
+            return None
+        if intent is None and shape == "count" and "outlet" not in next(iter(rows[0])).lower():
+            return None  # A day_count or total_reviews column isn't a number of outlets
+        if shape == "outlet_list":
+            return self._render_outlet_list(rows, intent, truncated)
+        return getattr(self, f"_render_{shape}")(rows, intent)
+
+    @staticmethod
+    def _area(intent: Optional[IntentMatch]) -> Optional[str]:
+        pattern = intent.params.get("pattern") if intent else None
+        return pattern.strip("%").title() if pattern else None
+
+    def _render_empty(self, rows, intent):
+        if intent and intent.intent in ("open_now", "open_on_day"):
+            return "I couldn't find any outlets open at that time."
+        return "I'm sorry, I couldn't find any information matching your query."
+
+    def _render_count(self, rows, intent):
+        count = int(next(iter(rows[0].values())))
+        area = self._area(intent)
+        if intent and intent.intent == "count_all":
+            return f"There are **{count}** Subway outlets in total."
+        if area:
+            if count == 1:
+                return f"There is **1** Subway outlet in {area}."
+            return f"There are **{count}** Subway outlets in {area}."
+        return f"I found **{count}** matching {'outlet' if count == 1 else 'outlets'}."
+
+    def _render_outlet(self, rows, intent):
+        row = rows[0]
+        name = f"**{row['name']}**"
+        if "is_open_now" in row:
+            hours = _hours_text(row)
+            if row["is_open_now"]:
+                if row.get("opening_time") == row.get("closing_time"):
+                    return f"{name} is open now, 24 hours today."
+                return f"{name} is open now, until {format_time(row['closing_time'])} today."
+            if hours is None:
+                return f"I don't have today's opening hours for {name}."
+            if hours == "Closed":
+                return f"{name} is closed today."
+            return f"{name} is closed right now. Today's hours are {hours}."
+        if "day_of_week" in row:
+            day = row["day_of_week"] or (intent.params.get("day") if intent else None) or "that day"
+            hours = _hours_text(row)
+            if hours is None:
+                return f"I don't have opening hours for {name} on {day}."
+            if hours == "Closed":
+                return f"{name} is closed on {day}."
+            return f"{name} is open on {day} from {format_time(row['opening_time'])} to {format_time(row['closing_time'])}."
+
+        kind = intent.intent if intent else None
+        if kind == "directions":
+            lines = [f"Here are directions to {name}:"]
+        elif kind == "closest_to_outlet":
+            lines = [f"The closest outlet is {name}."]
+        else:
+            lines = [name]
+        if row.get("address"):
+            lines.append(f"Address: {row['address']}")
+        if row.get("waze_link"):
+            lines.append(f"[Open in Waze]({row['waze_link']})")
+        elif kind == "directions":
+            lines.append("I don't have a navigation link for this outlet.")
+        return "\n\n".join(lines)
+
+    def _render_outlet_list(self, rows, intent, truncated=False):
+        kind = intent.intent if intent else None
+        area = self._area(intent)
+        where = f" in {area}" if area else ""
+        if kind == "closest_to_outlet":
+            intro = f"The {_plural(len(rows), 'closest outlet')}:"
+        elif kind in ("open_now", "open_on_day"):
+            when = "now" if kind == "open_now" else f"on {intent.params['day']}"
+            if truncated:
+                intro = f"More than {len(rows)} outlets{where} are open {when}. Here are the first {len(rows)}:"
+            else:
+                intro = f"{_plural(len(rows), 'outlet')}{where} {'is' if len(rows) == 1 else 'are'} open {when}:"
+        else:
+            intro = f"I found {_plural(len(rows), 'outlet')}:"
+
+        items = []
+        for position, row in enumerate(rows, 1):
+            item = f"{position}. **{row['name']}**"
+            details = []
+            distance = row.get("distance_km", row.get("distance"))
+            if distance is not None:
+                details.append(f"{float(distance):.2f} km away")
+            hours = _hours_text(row) if "opening_time" in row else None
+            if hours:
+                details.append(hours)
+            if details:
+                item += f" ({', '.join(details)})"
+            if row.get("address"):
+                item += f" – {row['address']}"
+            items.append(item)
+        return intro + "\n\n" + "\n".join(items)
+
+    def _render_hours(self, rows, intent):
+        # ReactMarkdown in the client renders plain CommonMark, so the "table" is a list of days
+        order = {day: index for index, day in enumerate(DAYS)}
+        rows = sorted(rows, key=lambda row: order.get(row["day_of_week"], len(DAYS)))
+        lines = [f"Opening hours for **{rows[0]['name']}**:", ""]
+        for row in rows:
+            lines.append(f"- **{row['day_of_week']}**: {_hours_text(row) or 'Not available'}")
+        return "\n".join(lines)
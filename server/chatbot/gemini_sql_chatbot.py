@@ -1,23 +1,49 @@
+import asyncio
 from datetime import datetime
+import time
 import uuid
 import traceback
-from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine, text
+from typing import List, Dict, Any, Optional, Callable
+from sqlalchemy import bindparam, create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
+from server.chatbot.answer_cache import AnswerCache
+from server.chatbot.answer_renderer import AnswerRenderer
+from server.chatbot.intent_router import IntentRouter
+from server.chatbot.metrics import LatencyStats
+from server.chatbot.result_cache import SQLResultCache, is_time_dependent_sql
+from server.config import CHATBOT_CONFIG
 
 # Import Gemini API
 import google.generativeai as genai
 
+# Distance patterns for the SQL prompt; earthdistance only exists once the extension is installed
+EARTHDISTANCE_GUIDANCE = """- For distance queries, prefilter with the earthdistance GiST index and then compute the distance, e.g.
+  WHERE earth_box(ll_to_earth(3.1390, 101.6869), 5000) @> ll_to_earth(latitude::float8, longitude::float8)
+  with earth_distance(ll_to_earth(3.1390, 101.6869), ll_to_earth(latitude::float8, longitude::float8)) / 1000 AS distance_km
+  (always cast latitude/longitude to float8 exactly like this so the index is used)"""
+HAVERSINE_GUIDANCE = """- For distance queries, compute the great-circle distance in kilometers with the haversine formula, e.g.
+  2 * 6371 * asin(sqrt(power(sin(radians(latitude::float8 - 3.1390) / 2), 2) +
+  cos(radians(3.1390)) * cos(radians(latitude::float8)) * power(sin(radians(longitude::float8 - 101.6869) / 2), 2))) AS distance_km"""
+
 class GeminiSQLChatbot:
-    def __init__(self, db_url, gemini_api_key):
-        """Initialize the Gemini-powered SQL Chatbot system"""
+    def __init__(self, db_url=None, gemini_api_key=None, db_engine=None, data_version: Optional[Callable[[], int]] = None,
+                 async_db_engine=None):
+        """
+        Initialize the Gemini-powered SQL Chatbot system.
+        
+        Pass db_engine to reuse a shared pool, and data_version to read the outlet
+        data version from an existing tracker instead of querying it per question.
+        query_async() runs its SQL on async_db_engine (an AsyncEngine) when given,
+        otherwise on db_engine in a worker thread.
+        """
         print("Initializing Gemini SQL Chatbot System...")
         
         # Start timing initialization
         start_time = datetime.now()
         
         # Set up database connection
-        self.db_engine = create_engine(db_url)
+        self.db_engine = db_engine if db_engine is not None else create_engine(db_url)
+        self.async_db_engine = async_db_engine
         self.test_db_connection()
         
         # Store sessions for conversation memory
@@ -30,11 +56,33 @@ class GeminiSQLChatbot:
         else:
             self._setup_gemini()
             
-        # Cache common query results
-        self.query_cache = {}
+        # Answers shared across sessions until they expire or the outlet data changes
+        self.answer_cache = AnswerCache(
+            maxsize=CHATBOT_CONFIG["answer_cache_size"],
+            ttl_seconds=CHATBOT_CONFIG["answer_cache_ttl_seconds"],
+        )
+        # Rows of generated SQL, shared by every phrasing that produces the same query
+        self.result_cache = SQLResultCache(
+            max_bytes=CHATBOT_CONFIG["sql_cache_max_bytes"],
+            ttl_seconds=CHATBOT_CONFIG["sql_cache_ttl_seconds"],
+            bucket_seconds=CHATBOT_CONFIG["sql_cache_time_bucket_seconds"],
+        )
+        self._data_version = data_version or self._get_data_version
+        # Common questions answered from SQL templates without asking Gemini for SQL
+        self.intent_router = IntentRouter(
+            self.db_engine, list_limit=CHATBOT_CONFIG["render_list_max_rows"],
+        ) if CHATBOT_CONFIG["intent_router"] else None
+        # Simple result shapes are phrased locally instead of with a second Gemini call
+        self.renderer = AnswerRenderer(
+            shapes=CHATBOT_CONFIG["render_shapes"],
+            list_max_rows=CHATBOT_CONFIG["render_list_max_rows"],
+        )
+        # Answer latency by path (answer cache, template or Gemini SQL, rendered or Gemini phrasing)
+        self.latency = LatencyStats()
         
         # Pre-load some common data
         self.outlet_count = self._get_total_outlet_count()
+        self.has_earthdistance = self._has_earthdistance()
         
         # Calculate initialization time
         end_time = datetime.now()
@@ -87,9 +135,31 @@ class GeminiSQLChatbot:
             print(f"Error getting outlet count: {str(e)}")
             return 0
     
+    def _has_earthdistance(self):
+        """Whether the earthdistance extension is installed, so the SQL prompt may use it"""
+        try:
+            with self.db_engine.connect() as conn:
+                result = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'earthdistance'"))
+                installed = result.scalar() is not None
+                print(f"earthdistance extension {'found' if installed else 'not installed'}")
+                return installed
+        except SQLAlchemyError as e:
+            print(f"Error checking for the earthdistance extension: {str(e)}")
+            return False
+    
+    def _get_data_version(self):
+        """Read the outlet data version marker (0 if it can't be read)"""
+        try:
+            with self.db_engine.connect() as conn:
+                return conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar() or 0
+        except SQLAlchemyError as e:
+            print(f"Error reading data version: {str(e)}")
+            return 0
+    
     def _get_db_schema(self):
         """Get database schema information for context"""
-        schema = """
+        distance_guidance = EARTHDISTANCE_GUIDANCE if self.has_earthdistance else HAVERSINE_GUIDANCE
+        schema = f"""
 Database Schema:
 
 Table: outlets
@@ -111,19 +181,28 @@ Table: operating_hours
 - closing_time (time without time zone)
 - is_closed (boolean, default false)
 
+Table: outlet_neighbors (precomputed k nearest other outlets of every outlet)
+- outlet_id (integer, foreign key to outlets.id with ON DELETE CASCADE)
+- rank (integer) - 1 is the nearest neighbour
+- neighbor_id (integer, foreign key to outlets.id with ON DELETE CASCADE)
+- distance_km (double precision) - great-circle distance in kilometers
+- Primary key (outlet_id, rank)
+
 Relationship: operating_hours.outlet_id references outlets.id (with CASCADE delete)
+Relationship: outlet_neighbors.outlet_id and outlet_neighbors.neighbor_id reference outlets.id
 
 Example Query Patterns:
 - When querying by time, use NOW()::time for comparison with opening_time and closing_time
 - For day of week comparison, use trim(to_char(NOW(), 'Day')) to match day_of_week values
+{distance_guidance}
+- For the outlets closest to a given outlet, read outlet_neighbors instead of computing distances, e.g.
+  SELECT n.name, nb.distance_km FROM outlets o JOIN outlet_neighbors nb ON nb.outlet_id = o.id
+  JOIN outlets n ON n.id = nb.neighbor_id WHERE o.name ILIKE '%Bangsar%' ORDER BY nb.rank
 """
         return schema
     
-    def _generate_sql_with_gemini(self, question):
-        """Generate SQL using Gemini model"""
-        if not self.model:
-            raise ValueError("Gemini model not initialized")
-        
+    def _sql_prompt(self, question):
+        """Build the SQL generation prompt for a question"""
         # Create a complete prompt with schema and question
         schema = self._get_db_schema()
         
@@ -148,35 +227,56 @@ Example Query Patterns:
     USER QUESTION: {question}
 
     SQL Query:"""
+        return prompt
+    
+    @staticmethod
+    def _clean_generated_sql(response_text):
+        """Extract the SQL query from Gemini's reply"""
+        sql_query = response_text.strip()
+        
+        # Remove markdown code blocks if present
+        if sql_query.startswith("```") and sql_query.endswith("```"):
+            # Extract content between the backticks
+            lines = sql_query.split("\n")
+            if len(lines) > 2:  # At least opening, content, and closing backticks
+                # Skip first line (opening backticks) and last line (closing backticks)
+                sql_query = "\n".join(lines[1:-1])
+            
+        # Also handle case where only sql tag and backticks are on the first line
+        if sql_query.startswith("```sql"):
+            sql_query = sql_query.replace("```sql", "", 1)
+            if sql_query.endswith("```"):
+                sql_query = sql_query[:-3]
+        
+        sql_query = sql_query.strip()
+        
+        # Basic validation
+        if not sql_query.upper().startswith("SELECT"):
+            raise ValueError(f"Generated query doesn't start with SELECT: {sql_query}")
+            
+        return sql_query
+    
+    def _generate_sql_with_gemini(self, question):
+        """Generate SQL using Gemini model"""
+        if not self.model:
+            raise ValueError("Gemini model not initialized")
         
         try:
             # Generate SQL with Gemini
-            response = self.model.generate_content(prompt)
-            
-            # Extract SQL from response and clean it
-            sql_query = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if sql_query.startswith("```") and sql_query.endswith("```"):
-                # Extract content between the backticks
-                lines = sql_query.split("\n")
-                if len(lines) > 2:  # At least opening, content, and closing backticks
-                    # Skip first line (opening backticks) and last line (closing backticks)
-                    sql_query = "\n".join(lines[1:-1])
-                
-            # Also handle case where only sql tag and backticks are on the first line
-            if sql_query.startswith("```sql"):
-                sql_query = sql_query.replace("```sql", "", 1)
-                if sql_query.endswith("```"):
-                    sql_query = sql_query[:-3]
-            
-            sql_query = sql_query.strip()
-            
-            # Basic validation
-            if not sql_query.upper().startswith("SELECT"):
-                raise ValueError(f"Generated query doesn't start with SELECT: {sql_query}")
-                
-            return sql_query
+            response = self.model.generate_content(self._sql_prompt(question))
+            return self._clean_generated_sql(response.text)
+        except Exception as e:
+            print(f"Error generating SQL with Gemini: {str(e)}")
+            raise
+    
+    async def _generate_sql_with_gemini_async(self, question):
+        """Generate SQL using Gemini's async client, without blocking the event loop"""
+        if not self.model:
+            raise ValueError("Gemini model not initialized")
+        
+        try:
+            response = await self.model.generate_content_async(self._sql_prompt(question))
+            return self._clean_generated_sql(response.text)
         except Exception as e:
             print(f"Error generating SQL with Gemini: {str(e)}")
             raise
@@ -208,7 +308,7 @@ Example Query Patterns:
             return False
                 
         # Ensure query only accesses our tables
-        allowed_tables = ["outlets", "operating_hours"]
+        allowed_tables = ["outlets", "operating_hours", "outlet_neighbors"]
         matches_allowed = False
         
         for table in allowed_tables:
@@ -222,22 +322,55 @@ Example Query Patterns:
             
         return True
     
-    def _execute_sql(self, sql_query):
-        """Execute SQL query and return results"""
+    @staticmethod
+    def _result_rows(result):
+        """Convert a query result to a list of dicts"""
+        if not result.returns_rows:
+            return []
+        columns = result.keys()
+        return [dict(zip(columns, row)) for row in result.fetchall()]
+    
+    def _execute_sql(self, sql_query, data_version=None, params=None):
+        """
+        Execute SQL query with optional bind parameters and return results (cached per data version when one is given).
+        
+        Database errors are logged and re-raised, so a failed query never yields an empty result that gets cached.
+        """
+        if data_version is not None:
+            cached = self.result_cache.get(sql_query, data_version, params)
+            if cached is not None:
+                print("SQL result cache hit")
+                return cached
         try:
             with self.db_engine.connect() as conn:
-                result = conn.execute(text(sql_query))
-                if result.returns_rows:
-                    # Convert to list of dicts
-                    columns = result.keys()
-                    data = [dict(zip(columns, row)) for row in result.fetchall()]
-                    return data
-                return []
+                data = self._result_rows(conn.execute(text(sql_query), params or {}))
+            if data_version is not None:
+                self.result_cache.put(sql_query, data_version, data, params)
+            return data
         except SQLAlchemyError as e:
             print(f"Error executing SQL: {str(e)}")
             print(f"Query was: {sql_query}")
-            print(traceback.format_exc())
-            return []
+            raise
+    
+    async def _execute_sql_async(self, sql_query, data_version=None, params=None):
+        """Execute SQL query on the async engine (the sync one in a worker thread if there is none)"""
+        if self.async_db_engine is None:
+            return await asyncio.to_thread(self._execute_sql, sql_query, data_version, params)
+        if data_version is not None:
+            cached = self.result_cache.get(sql_query, data_version, params)
+            if cached is not None:
+                print("SQL result cache hit")
+                return cached
+        try:
+            async with self.async_db_engine.connect() as conn:
+                data = self._result_rows(await conn.execute(text(sql_query), params or {}))
+            if data_version is not None:
+                self.result_cache.put(sql_query, data_version, data, params)
+            return data
+        except SQLAlchemyError as e:
+            print(f"Error executing SQL: {str(e)}")
+            print(f"Query was: {sql_query}")
+            raise
     
     def _format_query_results(self, results):
         """Format query results as a string for LLM consumption"""
@@ -260,11 +393,8 @@ Example Query Patterns:
             
         return output
 
-    def _generate_response_with_gemini(self, question, query_results, chat_history):
-        """Generate a natural language response from query results using Gemini"""
-        if not self.model:
-            raise ValueError("Gemini model not initialized")
-        
+    def _response_prompt(self, question, query_results, chat_history):
+        """Build the answer phrasing prompt from query results and recent history"""
         # Format query results
         formatted_results = self._format_query_results(query_results)
         
@@ -290,18 +420,34 @@ Please provide a helpful, conversational answer based on the database results. I
 Use markdown format to return the answer.
 
 Your response:"""
+        return prompt
+    
+    def _generate_response_with_gemini(self, question, query_results, chat_history):
+        """Generate a natural language response from query results using Gemini (raises on failure so callers can fall back)"""
+        if not self.model:
+            raise ValueError("Gemini model not initialized")
         
         try:
             # Generate response with Gemini
-            response = self.model.generate_content(prompt)
+            response = self.model.generate_content(self._response_prompt(question, query_results, chat_history))
             
             # Return the text response
             return response.text.strip()
         except Exception as e:
             print(f"Error generating response with Gemini: {str(e)}")
-            
-            # Fallback to a simple response based on results
-            return self._get_fallback_response(question, query_results)
+            raise
+    
+    async def _generate_response_with_gemini_async(self, question, query_results, chat_history):
+        """Generate a natural language response with Gemini's async client"""
+        if not self.model:
+            raise ValueError("Gemini model not initialized")
+        
+        try:
+            response = await self.model.generate_content_async(self._response_prompt(question, query_results, chat_history))
+            return response.text.strip()
+        except Exception as e:
+            print(f"Error generating response with Gemini: {str(e)}")
+            raise
     
     def _get_fallback_response(self, question, query_results):
         """Generate a fallback response when Gemini fails"""
@@ -360,33 +506,50 @@ Your response:"""
         
         return self.sessions[session_id]["history"]
     
-    def _get_relevant_outlets(self, sql_results, question):
-        """Extract relevant outlets from SQL results to return to frontend"""
+    @staticmethod
+    def _relevant_outlets_statement(sql_results):
+        """Query for the full rows of outlets named in SQL results, or None if no names were returned"""
+        # Extract outlet names from SQL results
+        outlet_names = sorted({row["name"] for row in sql_results if "name" in row and row["name"] is not None})
+        if not outlet_names:
+            return None
+        return text("SELECT * FROM outlets WHERE name IN :names").bindparams(
+            bindparam("names", value=outlet_names, expanding=True)
+        )
+    
+    @staticmethod
+    def _unique_outlets(rows):
+        """Drop repeated outlets and limit to 5 outlets max"""
         outlets = []
         seen_ids = set()
-        
+        for outlet in rows:
+            if outlet["id"] not in seen_ids:
+                outlets.append(outlet)
+                seen_ids.add(outlet["id"])
+        return outlets[:5]
+    
+    def _get_relevant_outlets(self, sql_results, question):
+        """Extract relevant outlets from SQL results to return to frontend"""
+        statement = self._relevant_outlets_statement(sql_results)
+        if statement is None:
+            return []
         try:
-            # Extract outlet names from SQL results
-            outlet_names = set()
-            for row in sql_results:
-                if "name" in row:
-                    outlet_names.add(row["name"])
-            
-            # If we found names, get full outlet data
-            if outlet_names:
-                names_list = "', '".join(outlet_names)
-                query = f"SELECT * FROM outlets WHERE name IN ('{names_list}')"
-                with self.db_engine.connect() as conn:
-                    result = conn.execute(text(query))
-                    columns = result.keys()
-                    for row in result:
-                        outlet = dict(zip(columns, row))
-                        if outlet["id"] not in seen_ids:
-                            outlets.append(outlet)
-                            seen_ids.add(outlet["id"])
-            
-            # Limit to 5 outlets max
-            return outlets[:5]
+            with self.db_engine.connect() as conn:
+                return self._unique_outlets(self._result_rows(conn.execute(statement)))
+        except SQLAlchemyError as e:
+            print(f"Error getting relevant outlets: {str(e)}")
+            return []
+    
+    async def _get_relevant_outlets_async(self, sql_results, question):
+        """Async counterpart of _get_relevant_outlets()"""
+        if self.async_db_engine is None:
+            return await asyncio.to_thread(self._get_relevant_outlets, sql_results, question)
+        statement = self._relevant_outlets_statement(sql_results)
+        if statement is None:
+            return []
+        try:
+            async with self.async_db_engine.connect() as conn:
+                return self._unique_outlets(self._result_rows(await conn.execute(statement)))
         except SQLAlchemyError as e:
             print(f"Error getting relevant outlets: {str(e)}")
             return []
@@ -406,85 +569,218 @@ Your response:"""
         
         return len(sessions_to_remove)
     
+    def _cached_answer(self, question, session_id, data_version, start):
+        """Return the shared answer cache's response for a question (recorded in the session), or None"""
+        cached_response = self.answer_cache.get(question, data_version)
+        if cached_response is None:
+            return None
+        print(f"Cache hit for query: {question}")
+        self.add_to_history(session_id, "assistant", cached_response["answer"])
+        self.latency.record("answer_cache", time.perf_counter() - start)
+        return {**cached_response, "session_id": session_id}
+    
+    def _validated_sql(self, sql_query):
+        """Reject generated SQL that fails the safety checks"""
+        if not self._is_sql_safe(sql_query):
+            raise ValueError("Generated SQL query failed safety validation")
+        return sql_query
+    
+    @staticmethod
+    def _sql_error_response(session_id, error):
+        print(f"Error generating SQL: {str(error)}")
+        return {
+            "answer": "I'm sorry, I encountered an error generating a database query for your question. Please try to rephrase or ask a different question.",
+            "relevant_outlets": [],
+            "session_id": session_id,
+            "error": str(error)
+        }
+    
+    def _error_response(self, session_id, error):
+        error_msg = f"Error processing query: {str(error)}"
+        print(error_msg)
+        print(traceback.format_exc())
+        
+        error_response = "I'm sorry, I encountered an error processing your question. Please try again with a different question."
+        self.add_to_history(session_id, "assistant", error_response)
+        
+        return {
+            "answer": error_response,
+            "relevant_outlets": [],
+            "session_id": session_id,
+            "error": str(error)
+        }
+    
+    def _finish_query(self, question, session_id, data_version, start, intent, response, phrasing, cacheable, relevant_outlets):
+        """Build the result, cache it, record it in the session and record the latency of its path"""
+        result = {
+            "answer": response,
+            "relevant_outlets": relevant_outlets,
+            "session_id": session_id
+        }
+        
+        # Cache the result for every session (the session ID is filled in per hit)
+        if cacheable:
+            self.answer_cache.put(question, data_version, result)
+        
+        # Add response to history
+        self.add_to_history(session_id, "assistant", response)
+        
+        self.latency.record(f"{'intent' if intent is not None else 'gemini_sql'}+{phrasing}", time.perf_counter() - start)
+        return result
+    
     def query(self, question, session_id=None):
-        """Process a user query using SQL and Gemini"""
+        """Process a user query using SQL and Gemini (blocking; the API uses query_async)"""
         # Generate a new session ID if not provided
         if not session_id:
             session_id = str(uuid.uuid4())
+        start = time.perf_counter()
             
         try:
             # Add question to history
             self.add_to_history(session_id, "user", question)
             
-            # Check cache for identical question
-            cache_key = f"{session_id}:{question.lower()}"
-            if cache_key in self.query_cache:
-                cached_response = self.query_cache[cache_key]
-                print(f"Cache hit for query: {question}")
+            # Check the shared answer cache; a hit skips both Gemini calls
+            data_version = self._data_version()
+            cached_response = self._cached_answer(question, session_id, data_version, start)
+            if cached_response is not None:
                 return cached_response
             
-            # Generate SQL query from question
+            # Answer common questions from a template; only unmatched ones need Gemini to write SQL
+            intent = self.intent_router.route(question, data_version) if self.intent_router else None
+            sql_params = None
             try:
-                sql_query = self._generate_sql_with_gemini(question)
-                
-                # Validate SQL for safety
-                if not self._is_sql_safe(sql_query):
-                    raise ValueError("Generated SQL query failed safety validation")
-                    
+                if intent is not None:
+                    print(f"Matched intent: {intent.intent}")
+                    sql_query, sql_params = intent.sql, intent.params
+                else:
+                    sql_query = self._validated_sql(self._generate_sql_with_gemini(question))
             except Exception as e:
-                print(f"Error generating SQL: {str(e)}")
-                return {
-                    "answer": "I'm sorry, I encountered an error generating a database query for your question. Please try to rephrase or ask a different question.",
-                    "relevant_outlets": [],
-                    "session_id": session_id,
-                    "error": str(e)
-                }
+                return self._sql_error_response(session_id, e)
             
-            print(f"Generated SQL: {sql_query}")
+            print(f"{'Template' if intent is not None else 'Generated'} SQL: {sql_query}")
             
-            # Execute SQL query
-            query_results = self._execute_sql(sql_query)
+            # Execute SQL query; a database error fails the request (uncached) like any other
+            query_results = self._execute_sql(sql_query, data_version, sql_params)
             print(f"Query returned {len(query_results)} results")
             
-            # Get chat history for context
-            chat_history = self.get_history(session_id)
-            
-            # Generate natural language response
-            try:
-                response = self._generate_response_with_gemini(question, query_results, chat_history)
-            except Exception as e:
-                print(f"Error generating response: {str(e)}")
-                response = self._get_fallback_response(question, query_results)
+            # Get chat history for context (a copy, so it matches what Gemini is shown)
+            chat_history = list(self.get_history(session_id))
+            
+            # Generate natural language response, locally when the result shape is simple enough
+            # Answers that depend on the clock (e.g. "open now") or fell back to a canned reply aren't cached
+            cacheable = not (is_time_dependent_sql(sql_query) or (intent is not None and intent.time_dependent))
+            response = self.renderer.render(query_results, intent)
+            if response is None:
+                # Phrasing that saw earlier turns of this conversation isn't shared with other sessions
+                if len(chat_history) > 1:
+                    cacheable = False
+                try:
+                    response = self._generate_response_with_gemini(question, query_results, chat_history)
+                except Exception as e:
+                    print(f"Error generating response: {str(e)}")
+                    response = self._get_fallback_response(question, query_results)
+                    cacheable = False
+                phrasing = "gemini"
+            else:
+                phrasing = "rendered"
             
             # Find relevant outlets to display on map
             relevant_outlets = self._get_relevant_outlets(query_results, question)
             
-            # Create result
-            result = {
-                "answer": response,
-                "relevant_outlets": relevant_outlets,
-                "session_id": session_id
-            }
+            return self._finish_query(question, session_id, data_version, start, intent, response, phrasing, cacheable, relevant_outlets)
+            
+        except Exception as e:
+            return self._error_response(session_id, e)
+    
+    async def query_async(self, question, session_id=None, data_version=None):
+        """
+        Process a user query without blocking the event loop.
+        
+        Gemini calls go through its async client and SQL through the async engine,
+        each stage bounded by its CHATBOT_CONFIG timeout. Cancelling the coroutine
+        (e.g. when the client disconnects) stops whichever stage is in flight.
+        Pass data_version when the caller already knows it (the API's outlet snapshot).
+        """
+        if not session_id:
+            session_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        
+        try:
+            self.add_to_history(session_id, "user", question)
             
-            # Cache the result
-            self.query_cache[cache_key] = result
+            if data_version is None:
+                data_version = await asyncio.to_thread(self._data_version)
+            cached_response = self._cached_answer(question, session_id, data_version, start)
+            if cached_response is not None:
+                return cached_response
             
-            # Add response to history
-            self.add_to_history(session_id, "assistant", response)
+            # Routing is in-memory unless the outlet name index has to be reloaded for a new data version
+            intent = None
+            if self.intent_router:
+                if self.intent_router.needs_reload(data_version):
+                    intent = await asyncio.to_thread(self.intent_router.route, question, data_version)
+                else:
+                    intent = self.intent_router.route(question, data_version)
+            sql_params = None
+            try:
+                if intent is not None:
+                    print(f"Matched intent: {intent.intent}")
+                    sql_query, sql_params = intent.sql, intent.params
+                else:
+                    sql_query = self._validated_sql(await asyncio.wait_for(
+                        self._generate_sql_with_gemini_async(question),
+                        CHATBOT_CONFIG["sql_generation_timeout_seconds"],
+                    ))
+            except asyncio.TimeoutError:
+                return self._sql_error_response(session_id, TimeoutError("Gemini SQL generation timed out"))
+            except Exception as e:
+                return self._sql_error_response(session_id, e)
             
-            return result
+            print(f"{'Template' if intent is not None else 'Generated'} SQL: {sql_query}")
             
-        except Exception as e:
-            error_msg = f"Error processing query: {str(e)}"
-            print(error_msg)
-            print(traceback.format_exc())
+            # A query that errors or runs too long fails the request (uncached) rather than holding a pooled connection
+            try:
+                query_results = await asyncio.wait_for(
+                    self._execute_sql_async(sql_query, data_version, sql_params),
+                    CHATBOT_CONFIG["sql_execution_timeout_seconds"],
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError("SQL execution timed out")
+            print(f"Query returned {len(query_results)} results")
             
-            error_response = "I'm sorry, I encountered an error processing your question. Please try again with a different question."
-            self.add_to_history(session_id, "assistant", error_response)
+            chat_history = list(self.get_history(session_id))
+            
+            cacheable = not (is_time_dependent_sql(sql_query) or (intent is not None and intent.time_dependent))
+            response = self.renderer.render(query_results, intent)
+            if response is None:
+                if len(chat_history) > 1:
+                    cacheable = False
+                try:
+                    response = await asyncio.wait_for(
+                        self._generate_response_with_gemini_async(question, query_results, chat_history),
+                        CHATBOT_CONFIG["response_generation_timeout_seconds"],
+                    )
+                except Exception as e:  # Includes asyncio.TimeoutError
+                    print(f"Error generating response: {str(e) or type(e).__name__}")
+                    response = self._get_fallback_response(question, query_results)
+                    cacheable = False
+                phrasing = "gemini"
+            else:
+                phrasing = "rendered"
             
-            return {
-                "answer": error_response,
-                "relevant_outlets": [],
-                "session_id": session_id,
-                "error": str(e)
-            }
\ No newline at end of file
+            try:
+                relevant_outlets = await asyncio.wait_for(
+                    self._get_relevant_outlets_async(query_results, question),
+                    CHATBOT_CONFIG["sql_execution_timeout_seconds"],
+                )
+            except asyncio.TimeoutError:
+                print("Relevant outlet lookup timed out")
+                relevant_outlets = []
+            
+            return self._finish_query(question, session_id, data_version, start, intent, response, phrasing, cacheable, relevant_outlets)
+            
+        except asyncio.CancelledError:
+            self.latency.record("cancelled", time.perf_counter() - start)
+            raise
+        except Exception as e:
+            return self._error_response(session_id, e)
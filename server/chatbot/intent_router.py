@@ -0,0 +1,334 @@
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from server.config import GEO_CONFIG, OUTLET_TIMEZONE
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Common abbreviations of areas, expanded before matching addresses
+AREA_ALIASES = {
+    "kl": "kuala lumpur",
+    "pj": "petaling jaya",
+    "jb": "johor bahru",
+}
+# Words that end an area phrase ("in Bangsar right now please")
+_AREA_TRAILERS = {"please", "pls", "now", "right", "currently", "open", "opened", "closed", "area", "on", "at", "are", "is", "that"}
+
+_OUTLET_WORDS = r"(?:outlets?|stores?|shops?|branch(?:es)?|restaurants?|locations?|subways?)"
+_COUNT = re.compile(
+    rf"^(?:how many|number of|count of|total)\b(?P<lead>(?:(?!\b(?:in|at|around|near)\b).)*?)\b{_OUTLET_WORDS}\b"
+    r"(?:(?P<between>.*?)\b(?:in|at|around|near)\s+(?P<area>.+)|(?P<rest>.*))$"
+)
+# What may come between "how many" and the outlet word; anything else ("drive thru", "24 hour") is a filter
+_COUNT_LEAD_WORDS = {"subway", "the", "total", "number", "of"}
+# The outlet word itself can repeat there too: "subway" matches first in "how many subway outlets"
+_OUTLET_NOUNS = {"outlet", "outlets", "store", "stores", "shop", "shops", "branch", "branches",
+                 "restaurant", "restaurants", "location", "locations"}
+# What may come between the outlet word and "in <area>"
+_COUNT_AREA_WORDS = {"are", "there", "is", "do", "does", "you", "we", "have", "has", "subway", "located", "exist"} | _OUTLET_NOUNS
+# What may follow "how many outlets" in a question about the total
+_COUNT_ALL_WORDS = {"are", "there", "is", "do", "does", "you", "have", "has", "subway", "exist", "altogether", "total", "in", "all"} | _OUTLET_NOUNS
+_COUNT_ALL_AREAS = {"total", "all", "malaysia", "the country"}
+_DIRECTIONS = re.compile(r"\b(?:directions?|how (?:do|can|would) i get to|how to get to|navigate|navigation|waze|route to|take me to)\b")
+_CLOSEST = re.compile(r"\b(?:closest|nearest|near|nearby|close to|next to|around)\b")
+_OPEN = re.compile(r"\b(?:open|opened|closed)\b")
+_HOURS = re.compile(r"\b(?:hours|what time|when (?:does|do|is|will)|timings?|schedule|close|closes|opens)\b")
+_WHERE = re.compile(r"^(?:where(?: exactly)? is|wheres|where can i find|whats the address of|what is the address of|address of|find)\b")
+_OPEN_LIST = re.compile(rf"^(?:which|what|any|list|show)(?: me)?(?: the| all)?(?: subway)? {_OUTLET_WORDS}\b")
+_AREA = re.compile(r"\b(?:in|at|around)\s+(?P<area>.+)$")
+_DAY = re.compile(r"\b(?P<day>monday|tuesday|wednesday|thursday|friday|saturday|sunday|today|tonight|tomorrow)s?\b")
+# Questions that compare or span days need more than a template: Gemini writes the SQL
+_COMPARATIVE = re.compile(r"\b(?:latest|earliest|later|earlier|late|early|until|till|longest|shortest|most|least|before|after)\b")
+_DAY_RANGE = re.compile(r"\b(?:weekends?|weekdays?)\b")
+# "Which outlet is closest to X" / "the nearest store to X" ask for one outlet
+_SINGLE_CLOSEST = re.compile(
+    r"\b(?:outlet|store|shop|branch|restaurant|location|subway) is (?:the )?(?:closest|nearest)\b"
+    r"|\bthe (?:closest|nearest) (?:outlet|store|shop|branch|restaurant|location|subway)\b(?! ?s\b)"
+)
+_OTHER = re.compile(r"\b(?:other|besides|apart from|except)\b")
+_NOW = re.compile(r"\b(?:now|currently|at the moment|still)\b")
+_LIMIT = re.compile(rf"\b(?P<limit>\d{{1,2}}|two|three|four|five)\s+(?:closest|nearest|{_OUTLET_WORDS})\b")
+_NUMBER_WORDS = {"two": 2, "three": 3, "four": 4, "five": 5}
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[^\w]+")
+
+def normalize_text(value: str) -> str:
+    """Lowercase and strip punctuation, keeping words in order."""
+    return " ".join(_NON_WORD.sub(" ", _APOSTROPHES.sub("", value.lower())).split())
+
+# The local clock of the outlets; every open-now template reads it through this CTE
+_CLOCK = "WITH clock AS (SELECT (NOW() AT TIME ZONE :tz) AS local_now) "
+_OPEN_AT_CLOCK = (
+    "(NOT oh.is_closed AND CASE WHEN oh.closing_time > oh.opening_time "
+    "THEN clock.local_now::time >= oh.opening_time AND clock.local_now::time < oh.closing_time "
+    "ELSE clock.local_now::time >= oh.opening_time OR clock.local_now::time < oh.closing_time END)"
+)
+_DAY_ORDER = "CASE oh.day_of_week " + " ".join(f"WHEN '{day}' THEN {i}" for i, day in enumerate(DAYS)) + " ELSE 7 END"
+
+TEMPLATES = {
+    "count_all": "SELECT COUNT(*) AS outlet_count FROM outlets",
+    "count_by_area": (
+        "SELECT COUNT(*) AS outlet_count FROM outlets "
+        "WHERE address ILIKE :pattern OR name ILIKE :pattern"
+    ),
+    "outlet_location": "SELECT id, name, address, waze_link FROM outlets WHERE id = :outlet_id",
+    "directions": "SELECT id, name, address, waze_link FROM outlets WHERE id = :outlet_id",
+    "outlet_hours": (
+        "SELECT o.name, o.address, oh.day_of_week, oh.opening_time, oh.closing_time, oh.is_closed "
+        "FROM outlets o JOIN operating_hours oh ON oh.outlet_id = o.id "
+        f"WHERE o.id = :outlet_id ORDER BY {_DAY_ORDER}"
+    ),
+    "outlet_open_on_day": (
+        "SELECT o.name, o.address, oh.day_of_week, oh.opening_time, oh.closing_time, oh.is_closed "
+        "FROM outlets o LEFT JOIN operating_hours oh ON oh.outlet_id = o.id AND oh.day_of_week = :day "
+        "WHERE o.id = :outlet_id"
+    ),
+    "outlet_open_now": (
+        _CLOCK +
+        "SELECT o.name, o.address, oh.day_of_week, oh.opening_time, oh.closing_time, oh.is_closed, "
+        f"{_OPEN_AT_CLOCK} AS is_open_now "
+        "FROM clock CROSS JOIN outlets o LEFT JOIN operating_hours oh ON oh.outlet_id = o.id "
+        "AND oh.day_of_week = trim(to_char(clock.local_now, 'Day')) "
+        "WHERE o.id = :outlet_id"
+    ),
+    "open_on_day": (
+        "SELECT o.name, o.address, oh.day_of_week, oh.opening_time, oh.closing_time "
+        "FROM outlets o JOIN operating_hours oh ON oh.outlet_id = o.id "
+        "WHERE oh.day_of_week = :day AND NOT oh.is_closed "
+        "AND (CAST(:pattern AS text) IS NULL OR o.address ILIKE :pattern OR o.name ILIKE :pattern) "
+        "ORDER BY o.name LIMIT :limit"
+    ),
+    "open_now": (
+        _CLOCK +
+        "SELECT o.name, o.address, oh.day_of_week, oh.opening_time, oh.closing_time "
+        "FROM clock CROSS JOIN outlets o JOIN operating_hours oh ON oh.outlet_id = o.id "
+        f"WHERE oh.day_of_week = trim(to_char(clock.local_now, 'Day')) AND {_OPEN_AT_CLOCK} "
+        "AND (CAST(:pattern AS text) IS NULL OR o.address ILIKE :pattern OR o.name ILIKE :pattern) "
+        "ORDER BY o.name LIMIT :limit"
+    ),
+    # The named outlet itself comes first (distance 0) unless the question asks for the others
+    "closest_to_outlet": (
+        "SELECT id, name, address, waze_link, distance_km FROM ("
+        "SELECT o.id, o.name, o.address, o.waze_link, 0.0 AS distance_km, 0 AS position "
+        "FROM outlets o WHERE o.id = :outlet_id AND CAST(:include_self AS boolean) "
+        "UNION ALL "
+        "SELECT n.id, n.name, n.address, n.waze_link, nb.distance_km, nb.rank AS position "
+        "FROM outlet_neighbors nb JOIN outlets n ON n.id = nb.neighbor_id WHERE nb.outlet_id = :outlet_id"
+        ") nearest ORDER BY position LIMIT :limit"
+    ),
+}
+
+@dataclass(frozen=True)
+class IntentMatch:
+    """A question recognised by the router, with the SQL template and parameters that answer it."""
+    intent: str
+    sql: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    time_dependent: bool = False  # The answer changes with the clock ("open now", "today")
+
+class OutletNameIndex:
+    """
+    Outlet names as word sequences, for finding the outlet a question mentions.
+
+    The "Subway" prefix is optional in questions, so "is bangsar village open"
+    matches "Subway Bangsar Village". When several outlets share the matched
+    words the mention is ambiguous and nothing is returned.
+    """
+
+    def __init__(self, outlets: List[Tuple[int, str]]):
+        self._by_words: Dict[Tuple[str, ...], set] = {}
+        for outlet_id, name in outlets:
+            words = tuple(normalize_text(name).split())
+            keys = {words}
+            if words and words[0] == "subway" and len(words) > 1:
+                keys.add(words[1:])
+            for key in keys:
+                self._by_words.setdefault(key, set()).add(outlet_id)
+        self._max_words = max((len(key) for key in self._by_words), default=0)
+
+    def __len__(self):
+        return len(self._by_words)
+
+    def match(self, question: str) -> Optional[int]:
+        """ID of the outlet named in a normalized question (longest mention wins), or None."""
+        words = question.split()
+        for length in range(min(self._max_words, len(words)), 0, -1):
+            found = set()
+            for start in range(len(words) - length + 1):
+                found |= self._by_words.get(tuple(words[start:start + length]), set())
+            if len(found) == 1:
+                return next(iter(found))
+            if found:
+                return None
+        return None
+
+class IntentRouter:
+    """
+    Deterministic intent layer in front of Gemini SQL generation.
+
+    Common questions (outlet counts by area, opening hours and open-now checks,
+    closest outlets, directions and addresses) are matched against precompiled
+    patterns and the outlet name index, and answered with parameterized SQL
+    templates. Anything else returns None and goes to Gemini.
+    """
+
+    def __init__(self, db_engine, list_limit: int = 10, closest_limit: int = GEO_CONFIG["nearest_k"],
+                 timezone: str = OUTLET_TIMEZONE):
+        self.db_engine = db_engine
+        self.list_limit = list_limit
+        self.closest_limit = closest_limit
+        self.timezone = timezone
+        self._names: Optional[OutletNameIndex] = None
+        self._names_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.matches = Counter()
+        self.fallthroughs = 0
+
+    def needs_reload(self, data_version: int) -> bool:
+        """Whether routing at this data version will first reload outlet names from the database."""
+        return self._names is None or self._names_version != data_version
+
+    def _outlet_names(self, data_version: int) -> OutletNameIndex:
+        """The outlet name index, reloaded when the data version changes."""
+        with self._lock:
+            if self._names is None or self._names_version != data_version:
+                try:
+                    with self.db_engine.connect() as conn:
+                        outlets = conn.execute(text("SELECT id, name FROM outlets")).fetchall()
+                    self._names = OutletNameIndex([(row[0], row[1]) for row in outlets])
+                    self._names_version = data_version
+                except SQLAlchemyError as e:
+                    print(f"Error loading outlet names for intent routing: {str(e)}")
+                    return self._names or OutletNameIndex([])
+            return self._names
+
+    def route(self, question: str, data_version: int) -> Optional[IntentMatch]:
+        """Match a question to an SQL template, or None when it should go to Gemini."""
+        match = self._match(normalize_text(question), data_version)
+        with self._lock:
+            if match is None:
+                self.fallthroughs += 1
+            else:
+                self.matches[match.intent] += 1
+        return match
+
+    def _match(self, question: str, data_version: int) -> Optional[IntentMatch]:
+        if _COMPARATIVE.search(question) or _DAY_RANGE.search(question):
+            return None  # "Which outlet closes the latest", "is X open on weekends"
+        count = _COUNT.match(question)
+        if count:
+            if _OPEN.search(question) or _HOURS.search(question):
+                return None  # "How many outlets are open now" filters by hours
+            if not set(count.group("lead").split()) <= _COUNT_LEAD_WORDS:
+                return None
+            if count.group("area") is not None and not set(count.group("between").split()) <= _COUNT_AREA_WORDS:
+                return None  # "How many outlets have drive thru in KL" filters by more than the area
+            area = self._area(count.group("area"))
+            if area in _COUNT_ALL_AREAS or (count.group("area") is None and set(count.group("rest").split()) <= _COUNT_ALL_WORDS):
+                return IntentMatch("count_all", TEMPLATES["count_all"])
+            if area:
+                return IntentMatch("count_by_area", TEMPLATES["count_by_area"], {"pattern": f"%{area}%"})
+            return None
+
+        # "Which outlets are open in Bangsar" names an area even when an outlet is called "Subway Bangsar"
+        if _OPEN.search(question) and _OPEN_LIST.match(question):
+            return self._match_open_list(question)
+
+        outlet_id = self._outlet_names(data_version).match(question)
+        if outlet_id is not None:
+            return self._match_outlet(question, outlet_id)
+        return None
+
+    def _match_outlet(self, question: str, outlet_id: int) -> Optional[IntentMatch]:
+        """Intents about one named outlet."""
+        params = {"outlet_id": outlet_id}
+        if _DIRECTIONS.search(question):
+            return IntentMatch("directions", TEMPLATES["directions"], params)
+        if _CLOSEST.search(question):
+            # The outlet named after a place ("closest to KLCC") is itself the closest one
+            limit = _LIMIT.search(question)
+            if limit:
+                params["limit"] = self._limit(limit.group("limit"), self.closest_limit)
+            else:
+                params["limit"] = 1 if _SINGLE_CLOSEST.search(question) else self.closest_limit
+            params["include_self"] = not _OTHER.search(question)
+            return IntentMatch("closest_to_outlet", TEMPLATES["closest_to_outlet"], params)
+        day = _DAY.search(question)
+        day_word = day.group("day") if day else None
+        asks_open, asks_hours = _OPEN.search(question), _HOURS.search(question)
+        if day_word and day_word not in ("today", "tonight") and (asks_open or asks_hours):
+            resolved, relative = self._day(day_word)
+            return IntentMatch("outlet_open_on_day", TEMPLATES["outlet_open_on_day"],
+                               {**params, "day": resolved}, time_dependent=relative)
+        # "When does X open" asks for the hours; "is X open", "X open now/today" for the current status
+        if _NOW.search(question) or (day_word and (asks_open or asks_hours)) or (asks_open and not asks_hours):
+            return IntentMatch("outlet_open_now", TEMPLATES["outlet_open_now"],
+                               {**params, "tz": self.timezone}, time_dependent=True)
+        if asks_hours:
+            return IntentMatch("outlet_hours", TEMPLATES["outlet_hours"], params)
+        if _WHERE.match(question):
+            return IntentMatch("outlet_location", TEMPLATES["outlet_location"], params)
+        return None
+
+    def _match_open_list(self, question: str) -> Optional[IntentMatch]:
+        """"Which outlets are open now / on Sunday (in <area>)"."""
+        if _HOURS.search(question) or re.search(r"\b24\b", question):
+            return None  # "open 24 hours", "open until what time" need more than a status filter
+        day = _DAY.search(question)
+        area_match = _AREA.search(question)
+        area = self._area(area_match.group("area")) if area_match else None
+        if area_match and not area:
+            return None
+        # One row past list_limit tells the renderer that the list was cut short
+        params = {"pattern": f"%{area}%" if area else None, "limit": self.list_limit + 1}
+        if day and day.group("day") not in ("today", "tonight"):
+            resolved, relative = self._day(day.group("day"))
+            return IntentMatch("open_on_day", TEMPLATES["open_on_day"], {**params, "day": resolved}, time_dependent=relative)
+        return IntentMatch("open_now", TEMPLATES["open_now"], {**params, "tz": self.timezone}, time_dependent=True)
+
+    def _day(self, word: str) -> Tuple[str, bool]:
+        """Day name for a day word, and whether it depends on today's date."""
+        if word == "tomorrow":
+            tomorrow = datetime.now(ZoneInfo(self.timezone)) + timedelta(days=1)
+            return DAYS[tomorrow.weekday()], True
+        return word.capitalize(), False
+
+    @staticmethod
+    def _area(phrase: Optional[str]) -> Optional[str]:
+        """Clean an area phrase ("the bangsar area please" -> "bangsar"); None if nothing usable is left."""
+        if not phrase:
+            return None
+        words = phrase.split()
+        if words and words[0] == "the":
+            words = words[1:]
+        for index, word in enumerate(words):
+            if word in _AREA_TRAILERS or _DAY.fullmatch(word):
+                words = words[:index]
+                break
+        area = " ".join(AREA_ALIASES.get(word, word) for word in words)
+        return area if len(area) >= 2 else None
+
+    @staticmethod
+    def _limit(value: Optional[str], default: int) -> int:
+        if value is None:
+            return default
+        number = _NUMBER_WORDS.get(value) or int(value)
+        return max(1, min(number, default))
+
+    def stats(self) -> Dict[str, Any]:
+        """How many questions each intent answered, and how many went to Gemini."""
+        with self._lock:
+            routed = sum(self.matches.values())
+            total = routed + self.fallthroughs
+            return {
+                "matches": dict(self.matches),
+                "fallthroughs": self.fallthroughs,
+                "routed_rate": round(routed / total, 4) if total else None,
+            }
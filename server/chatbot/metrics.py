@@ -0,0 +1,46 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+class LatencyStats:
+    """
+    Per-path latency of chatbot answers.
+
+    Keeps a count, total and maximum per path plus the most recent samples
+    (up to window per path) for percentiles, so memory stays bounded.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float):
+        """Add one answer's latency to a path."""
+        with self._lock:
+            samples = self._samples.setdefault(path, deque(maxlen=self.window))
+            samples.append(seconds)
+            totals = self._totals.setdefault(path, {"count": 0, "total": 0.0, "max": 0.0})
+            totals["count"] += 1
+            totals["total"] += seconds
+            totals["max"] = max(totals["max"], seconds)
+
+    @staticmethod
+    def _percentile(ordered, fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    def stats(self) -> Dict[str, Any]:
+        """Count, mean, p50, p95 and max latency in milliseconds per path."""
+        with self._lock:
+            result = {}
+            for path, totals in self._totals.items():
+                ordered = sorted(self._samples[path])
+                result[path] = {
+                    "count": int(totals["count"]),
+                    "mean_ms": round(totals["total"] / totals["count"] * 1000, 1),
+                    "p50_ms": round(self._percentile(ordered, 0.5) * 1000, 1),
+                    "p95_ms": round(self._percentile(ordered, 0.95) * 1000, 1),
+                    "max_ms": round(totals["max"] * 1000, 1),
+                }
+            return result
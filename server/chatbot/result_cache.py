@@ -0,0 +1,110 @@
+import re
+import sys
+import time
+from typing import Any, Dict, Hashable, List, Optional
+from server.chatbot.versioned_cache import CountingTLRUCache, VersionedCache
+
+# SQL whose result changes with the clock (NOW(), to_char(NOW(), ...), CURRENT_DATE, ...)
+_TIME_DEPENDENT_SQL = re.compile(r"\b(now\s*\(|current_(date|time|timestamp)\b|localtime(stamp)?\b)", re.IGNORECASE)
+# String literals and quoted identifiers are kept verbatim; comments and whitespace runs are not
+_SQL_TOKENS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/|\s+)", re.DOTALL)
+
+def is_time_dependent_sql(sql_query: str) -> bool:
+    """Whether a SQL query reads the current time, so its result goes stale without a data change."""
+    return bool(_TIME_DEPENDENT_SQL.search(_SQL_TOKENS.sub(_strip_literal, sql_query)))
+
+def _strip_literal(match: re.Match) -> str:
+    token = match.group(0)
+    return "''" if token.startswith("'") else " "
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Reduce a SQL query to a canonical form for result caching.
+
+    Comments are removed, whitespace runs collapse to one space, unquoted text is
+    lowercased (PostgreSQL folds unquoted identifiers and keywords anyway) and a
+    trailing semicolon is dropped. String literals and quoted identifiers are kept
+    as written, so "WHERE name ILIKE '%KLCC%'" and "where name ilike '%klcc%'"
+    stay distinct.
+    """
+    parts = []
+    for token in _SQL_TOKENS.split(sql_query):
+        if not token:
+            continue
+        if token.startswith(("'", '"')):
+            parts.append(token)
+        elif token.startswith("--") or token.startswith("/*") or token.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        else:
+            parts.append(token.lower())
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+def result_size(rows: List[Dict[str, Any]]) -> int:
+    """Approximate memory held by a list of result rows, in bytes."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for key, value in row.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+class SQLResultCache(VersionedCache):
+    """
+    Byte-bounded cache of generated-SQL results, shared across sessions.
+
+    Keys combine the normalized SQL text with the outlet data version, so
+    different phrasings that Gemini turns into the same query share one entry
+    and a data refresh drops them all. Queries that read the clock are keyed by
+    a time bucket as well and expire at the end of it, so "open now" results
+    are never older than bucket_seconds.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 3600,
+                 bucket_seconds: float = 60, timer=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        self._timer = timer
+        super().__init__(CountingTLRUCache(maxsize=max_bytes, ttu=self._expires_at, timer=timer,
+                                           getsizeof=result_size))
+        self.oversized = 0
+
+    def _expires_at(self, key, value, now: float) -> float:
+        bucket = key[2]
+        if bucket is None:
+            return now + self.ttl_seconds
+        return min(now + self.ttl_seconds, (bucket + 1) * self.bucket_seconds)
+
+    def key(self, sql_query: str, data_version: int, params: Optional[Dict[str, Any]] = None) -> Hashable:
+        """Cache key of a query and its bind parameters at a data version (and, for clock-dependent SQL, the current time bucket)."""
+        bucket = int(self._timer() // self.bucket_seconds) if is_time_dependent_sql(sql_query) else None
+        return (data_version, normalize_sql(sql_query), bucket, tuple(sorted((params or {}).items())))
+
+    def get(self, sql_query: str, data_version: int,
+            params: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached rows of a query at a data version, or None."""
+        return self._get(self.key(sql_query, data_version, params), data_version)
+
+    def put(self, sql_query: str, data_version: int, rows: List[Dict[str, Any]],
+            params: Optional[Dict[str, Any]] = None):
+        """Cache the rows of a query, unless the data has moved on or they exceed the whole budget."""
+        self._put(self.key(sql_query, data_version, params), data_version, rows)
+
+    def _store(self, key: Hashable, rows: List[Dict[str, Any]]):
+        try:
+            self._cache[key] = rows
+        except ValueError:  # Larger than max_bytes on its own
+            self.oversized += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy in bytes."""
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "bytes": self._cache.currsize,
+                "max_bytes": self._cache.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "time_bucket_seconds": self.bucket_seconds,
+                **self._counter_stats(),
+                "oversized": self.oversized,
+            }
@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Dict, Hashable, Optional
+from cachetools import TLRUCache, TTLCache
+
+class CountingCacheMixin:
+    """cachetools cache mixin that counts entries dropped for space (LRU) and for age."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+    def clear(self):
+        # MutableMapping.clear() empties the cache through popitem(); that is not an eviction
+        evictions = self.evictions
+        super().clear()
+        self.evictions = evictions
+
+class CountingTTLCache(CountingCacheMixin, TTLCache):
+    """TTLCache that counts evictions and expirations."""
+
+class CountingTLRUCache(CountingCacheMixin, TLRUCache):
+    """TLRUCache that counts evictions and expirations."""
+
+class VersionedCache:
+    """
+    Thread-safe wrapper around a counting cache whose keys include the outlet data version.
+
+    The first lookup or store at a newer version empties the cache, since every
+    older entry has become unreachable; stores computed at an older version
+    than the current one are dropped.
+    """
+
+    def __init__(self, cache: CountingCacheMixin):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, data_version: int):
+        if data_version != self._version:
+            if self._version is not None and len(self._cache):
+                self._cache.clear()
+                self.invalidations += 1
+            self._version = data_version
+
+    def _get(self, key: Hashable, data_version: int) -> Optional[Any]:
+        with self._lock:
+            self._check_version(data_version)
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def _put(self, key: Hashable, data_version: int, value: Any):
+        with self._lock:
+            if self._version is not None and data_version < self._version:
+                return
+            self._check_version(data_version)
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any):
+        self._cache[key] = value
+
+    def clear(self):
+        """Drop every cached entry (counters are kept)."""
+        with self._lock:
+            self._cache.clear()
+
+    def _counter_stats(self) -> Dict[str, Any]:
+        # Callers hold self._lock
+        lookups = self.hits + self.misses
+        return {
+            "data_version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self._cache.evictions,
+            "expirations": self._cache.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -15,9 +16,80 @@ DB_CONFIG = {
     "port": int(os.environ.get('DB_PORT', 5432))
 }
 
+# Connection pool configuration, shared by the API, chatbot and scraper
+DB_POOL_CONFIG = {
+    "pool_size": int(os.environ.get('DB_POOL_SIZE', 5)),
+    "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    "pool_timeout": int(os.environ.get('DB_POOL_TIMEOUT', 30)),  # Seconds to wait for a free connection
+    "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # Seconds before a connection is replaced
+    "pool_pre_ping": os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+}
+
+# Chatbot configuration
+CHATBOT_CONFIG = {
+    # Answers cached across sessions, keyed by normalized question and outlet data version
+    "answer_cache_size": int(os.environ.get('CHATBOT_ANSWER_CACHE_SIZE', 1024)),
+    "answer_cache_ttl_seconds": float(os.environ.get('CHATBOT_ANSWER_CACHE_TTL_SECONDS', 3600)),
+    # Rows of generated SQL, keyed by normalized query and data version; bounded by estimated size
+    "sql_cache_max_bytes": int(os.environ.get('CHATBOT_SQL_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+    "sql_cache_ttl_seconds": float(os.environ.get('CHATBOT_SQL_CACHE_TTL_SECONDS', 3600)),
+    # Queries using NOW()/CURRENT_DATE are cached per time bucket of this length
+    "sql_cache_time_bucket_seconds": float(os.environ.get('CHATBOT_SQL_CACHE_TIME_BUCKET_SECONDS', 60)),
+    # Answer common questions from SQL templates instead of Gemini-generated SQL
+    "intent_router": os.environ.get('CHATBOT_INTENT_ROUTER', 'true').lower() == 'true',
+    # Result shapes answered with local markdown instead of a Gemini phrasing call
+    # (any of empty, count, outlet, outlet_list, hours)
+    "render_shapes": [shape.strip() for shape in os.environ.get('CHATBOT_RENDER_SHAPES', 'empty,count,outlet,outlet_list,hours').split(',') if shape.strip()],
+    "render_list_max_rows": int(os.environ.get('CHATBOT_RENDER_LIST_MAX_ROWS', 10)),
+    # Per-stage limits of the async pipeline
+    "sql_generation_timeout_seconds": float(os.environ.get('CHATBOT_SQL_GENERATION_TIMEOUT_SECONDS', 20)),
+    "sql_execution_timeout_seconds": float(os.environ.get('CHATBOT_SQL_EXECUTION_TIMEOUT_SECONDS', 10)),
+    "response_generation_timeout_seconds": float(os.environ.get('CHATBOT_RESPONSE_GENERATION_TIMEOUT_SECONDS', 20)),
+    # How often a pending /chatbot/query checks whether its client has gone away
+    "disconnect_poll_seconds": float(os.environ.get('CHATBOT_DISCONNECT_POLL_SECONDS', 0.5))
+}
+
 HF_API_TOKEN = os.environ.get('HUGGINGFACE_API_TOKEN', '')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
 
+# In-memory outlet snapshot configuration
+SNAPSHOT_CONFIG = {
+    # How often (seconds) the API checks the data_version marker for writes made by other processes
+    "version_check_interval": float(os.environ.get('SNAPSHOT_VERSION_CHECK_SECONDS', 30))
+}
+
+# Geo query configuration
+GEO_CONFIG = {
+    # "memory" answers /outlets/nearby from the in-process spatial index,
+    # "sql" runs an earthdistance bounding-box query against the GiST index instead
+    "nearby_backend": os.environ.get('NEARBY_BACKEND', 'memory').lower(),
+    # Radii (km) whose outlet overlap graphs are precomputed for each data version
+    "overlap_radii_km": sorted(float(radius) for radius in os.environ.get('OVERLAP_RADII_KM', '5').split(',') if radius.strip()),
+    # Nearest other outlets precomputed per outlet into the outlet_neighbors table
+    "nearest_k": int(os.environ.get('NEAREST_NEIGHBORS_K', 5))
+}
+
+# Vector tile (/tiles/{z}/{x}/{y}.mvt) configuration
+TILE_CONFIG = {
+    "max_zoom": int(os.environ.get('TILE_MAX_ZOOM', 22)),
+    # Tiles kept in memory per data version (least recently used are dropped first)
+    "memory_cache_tiles": int(os.environ.get('TILE_MEMORY_CACHE_TILES', 4096)),
+    # Directory for the on-disk tile cache, shared by worker processes; empty disables it
+    "cache_dir": os.environ.get('TILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'subway-tiles')),
+    # Tiles up to this zoom are rendered at startup
+    "warm_max_zoom": int(os.environ.get('TILE_WARM_MAX_ZOOM', 6))
+}
+
+# Delta sync (/outlets/changes) configuration
+SYNC_CONFIG = {
+    # Seconds each sync looks back past its token, so rows written by transactions that were
+    # still open at the last sync (and so carry an older timestamp) are not missed
+    "overlap_seconds": float(os.environ.get('SYNC_OVERLAP_SECONDS', 300))
+}
+
+# Timezone the outlets' operating hours are expressed in
+OUTLET_TIMEZONE = os.environ.get('OUTLET_TIMEZONE', 'Asia/Kuala_Lumpur')
+
 # Scraper configuration
 SCRAPER_CONFIG = {
     "url": "https://subway.com.my/find-a-subway",
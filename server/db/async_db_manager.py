@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from server.db.models import Outlet, DataVersion
+from server.db.engine import get_async_engine, get_async_session_factory
+from server.db.db_manager import (outlet_fields_statement, search_statement, nearby_statement, nearby_hits,
+                                  changes_statements, outlet_changes)
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseManager:
+    """
+    Async counterpart of DatabaseManager for the API's read queries.
+    
+    Uses SQLAlchemy's asyncio engine with asyncpg, so a request waiting on
+    PostgreSQL yields the event loop instead of holding a threadpool worker.
+    Writes (scraper, maintenance scripts) stay on the sync DatabaseManager.
+    """
+    
+    def __init__(self, **connection_params):
+        """Initialize database connection parameters using the shared, pooled async engine."""
+        self.engine = get_async_engine(connection_params)
+        self.SessionFactory = get_async_session_factory(connection_params)
+        self.session = None
+    
+    async def __aenter__(self):
+        """Async context manager entry point - connect to the database."""
+        await self.connect()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit point - ensure connection is closed."""
+        await self.close()
+        if exc_type is not None:
+            logger.error(f"An error occurred: {exc_val}")
+            return False  # Re-raise the exception
+    
+    async def connect(self):
+        """Open a session (reuses the open session if there is one); connections are checked out lazily."""
+        if self.session:
+            return
+        try:
+            self.session = self.SessionFactory()
+        except SQLAlchemyError as e:
+            logger.error(f"Error connecting to the database: {e}")
+            raise
+    
+    async def close(self):
+        """Close the session and return its connection to the pool."""
+        if self.session:
+            await self.session.close()
+            self.session = None
+    
+    async def search_outlets(self, query_text: str, fuzzy: bool = False, columns: Optional[List[str]] = None,
+                             include_hours: bool = True, after: Optional[Tuple[float, int]] = None,
+                             limit: Optional[int] = None, outlet_ids: Optional[Set[int]] = None,
+                             include_nearest: bool = False) -> List[Tuple[Outlet, float]]:
+        """Search outlets by name or address, best matches first; see DatabaseManager.search_outlets()."""
+        await self.connect()
+        statement = search_statement(query_text, fuzzy=fuzzy, columns=columns, include_hours=include_hours,
+                                     after=after, limit=limit, outlet_ids=outlet_ids, include_nearest=include_nearest)
+        result = await self.session.execute(statement)
+        return [(outlet, float(outlet_rank)) for outlet, outlet_rank in result.all()]
+    
+    async def search_outlet_ids(self, query_text: str, fuzzy: bool = False, after: Optional[Tuple[float, int]] = None,
+                                limit: Optional[int] = None, outlet_ids: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """Like search_outlets(), but only return (outlet_id, rank) pairs, for callers that render outlets themselves."""
+        await self.connect()
+        statement = search_statement(query_text, fuzzy=fuzzy, after=after, limit=limit, outlet_ids=outlet_ids, ids_only=True)
+        result = await self.session.execute(statement)
+        return [(outlet_id, float(outlet_rank)) for outlet_id, outlet_rank in result.all()]
+    
+    async def stream_outlets(self, columns: Optional[List[str]] = None, include_hours: bool = True,
+                             after_id: Optional[int] = None, outlet_ids: Optional[Set[int]] = None,
+                             limit: Optional[int] = None, chunk_size: int = 500,
+                             include_nearest: bool = False) -> AsyncIterator[List[Outlet]]:
+        """
+        Read outlets ordered by ID in chunks through a server-side cursor.
+        
+        Only one chunk (and its operating hours, loaded with one IN query per
+        chunk) is held in memory at a time.
+        
+        Args:
+            columns: Outlet columns to load, see outlet_fields_statement()
+            include_hours: Whether to load operating hours
+            after_id: Only return outlets with a greater ID
+            outlet_ids: Only return these outlets
+            limit: Maximum number of outlets
+            chunk_size: Rows fetched from the cursor per chunk
+            include_nearest: Whether to load the precomputed nearest neighbours
+            
+        Yields:
+            Lists of up to chunk_size Outlet objects
+        """
+        await self.connect()
+        statement = outlet_fields_statement(columns=columns, include_hours=include_hours, include_nearest=include_nearest)
+        if after_id is not None:
+            statement = statement.where(Outlet.id > after_id)
+        if outlet_ids is not None:
+            statement = statement.where(Outlet.id.in_(outlet_ids))
+        statement = statement.order_by(Outlet.id)
+        if limit is not None:
+            statement = statement.limit(limit)
+        
+        result = await self.session.stream(statement.execution_options(yield_per=chunk_size))
+        async for outlets in result.scalars().partitions():
+            yield outlets
+    
+    async def find_nearby_outlets(self, latitude: float, longitude: float, radius_km: Optional[float] = None,
+                                  k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Find outlets near a point using the earthdistance GiST index; see DatabaseManager.find_nearby_outlets()."""
+        await self.connect()
+        statement, params = nearby_statement(latitude, longitude, radius_km=radius_km, k=k)
+        result = await self.session.execute(statement, params)
+        return nearby_hits(result.fetchall(), radius_km)
+    
+    async def get_changes(self, since: Optional[datetime] = None,
+                          overlap: timedelta = timedelta(0)) -> Tuple[Optional[datetime], List[Outlet], List[int]]:
+        """Outlets upserted and deleted since a point in time; see DatabaseManager.get_changes()."""
+        await self.connect()
+        upserted, deleted = changes_statements(since, overlap)
+        outlets = (await self.session.execute(upserted)).scalars().all()
+        tombstones = (await self.session.execute(deleted)).all()
+        return outlet_changes(outlets, tombstones, since)
+    
+    async def get_data_version(self) -> int:
+        """Return the current outlet data version (0 if nothing has been written yet)."""
+        await self.connect()
+        result = await self.session.execute(select(DataVersion.version).where(DataVersion.id == 1))
+        return result.scalar() or 0
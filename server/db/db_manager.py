@@ -1,20 +1,181 @@
 import logging
-from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Callable, Set, Tuple
+from sqlalchemy import text, func, literal, cast, or_, and_, select, insert, REAL
+from sqlalchemy.orm import Session, Query, selectinload, load_only
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.exc import SQLAlchemyError
-from server.db.models import Base, Outlet, OperatingHours
+from server.db.models import Base, Outlet, OperatingHours, DataVersion, OutletTombstone, OutletNeighbor
+from server.db.engine import get_engine, get_session_factory
 
 logger = logging.getLogger(__name__)
 
+# earthdistance works on a sphere of radius earth() = 6378168 m, while distances we
+# report use the 6371 km mean radius; box radii are scaled so both agree on the angle
+EARTH_RADIUS_M = 6371000.0
+EARTHDISTANCE_RADIUS_M = 6378168.0
+
+# Exact great-circle distance (km) between :lat/:lng and an outlet row
+_HAVERSINE_KM_SQL = """
+    2 * 6371 * asin(sqrt(
+        power(sin(radians(latitude::float8 - :lat) / 2), 2) +
+        cos(radians(:lat)) * cos(radians(latitude::float8)) *
+        power(sin(radians(longitude::float8 - :lng) / 2), 2)
+    ))
+"""
+
+# Index-assisted prefilter: bounding cube around the search circle, matched against the GiST index
+_NEARBY_WITHIN_RADIUS_SQL = text(f"""
+    SELECT id, distance FROM (
+        SELECT id, {_HAVERSINE_KM_SQL} AS distance
+        FROM outlets
+        WHERE earth_box(ll_to_earth(:lat, :lng), :box_radius_m) @> ll_to_earth(latitude::float8, longitude::float8)
+    ) candidates
+    WHERE distance <= :radius_km
+    ORDER BY distance
+""")
+
+# k-nearest: the cube GiST index supports ordering by <-> (chord distance, monotonic in great-circle distance)
+_NEAREST_SQL = text(f"""
+    SELECT id, {_HAVERSINE_KM_SQL} AS distance
+    FROM outlets
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    ORDER BY ll_to_earth(latitude::float8, longitude::float8) <-> ll_to_earth(:lat, :lng)
+    LIMIT :k
+""")
+
+def outlet_fields_statement(columns: Optional[List[str]] = None, include_hours: bool = True,
+                            include_nearest: bool = False) -> Select:
+    """
+    Build a SELECT of outlets that loads only the requested columns.
+    
+    Args:
+        columns: Outlet column names to load (the primary key is always loaded); None loads all
+        include_hours: Whether to eager-load operating hours (one extra IN query per result set)
+        include_nearest: Whether to eager-load the precomputed nearest neighbours (likewise)
+        
+    Returns:
+        Select over Outlet, usable with both sync and async sessions
+    """
+    statement = select(Outlet)
+    if include_hours:
+        statement = statement.options(selectinload(Outlet.operating_hours))
+    if include_nearest:
+        statement = statement.options(selectinload(Outlet.nearest_neighbors))
+    if columns is not None:
+        statement = statement.options(load_only(*[getattr(Outlet, column) for column in columns]))
+    return statement
+
+def search_statement(query_text: str, fuzzy: bool = False, columns: Optional[List[str]] = None,
+                     include_hours: bool = True, after: Optional[Tuple[float, int]] = None,
+                     limit: Optional[int] = None, outlet_ids: Optional[Set[int]] = None, ids_only: bool = False,
+                     include_nearest: bool = False) -> Select:
+    """Build the ranked outlet search SELECT (Outlet, rank), or (id, rank) with ids_only; see DatabaseManager.search_outlets()."""
+    search_term = literal(query_text)
+    # word_similarity() scores how well the query matches any part of the text
+    rank = func.greatest(
+        func.word_similarity(search_term, Outlet.name),
+        func.word_similarity(search_term, func.coalesce(Outlet.address, "")),
+    )
+    if fuzzy:
+        # <% is true when word_similarity exceeds pg_trgm.word_similarity_threshold
+        condition = or_(search_term.op("<%")(Outlet.name), search_term.op("<%")(Outlet.address))
+    else:
+        pattern = "%" + query_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        condition = or_(Outlet.name.ilike(pattern, escape="\\"), Outlet.address.ilike(pattern, escape="\\"))
+    
+    statement = select(Outlet.id) if ids_only else outlet_fields_statement(columns=columns, include_hours=include_hours,
+                                                                         include_nearest=include_nearest)
+    statement = statement.add_columns(rank).where(condition)
+    if outlet_ids is not None:
+        statement = statement.where(Outlet.id.in_(outlet_ids))
+    if after is not None:
+        # Keyset on (rank, id); ranks are real, so compare in real to avoid rounding drift
+        after_rank, after_id = cast(after[0], REAL), after[1]
+        statement = statement.where(or_(rank < after_rank, and_(rank == after_rank, Outlet.id > after_id)))
+    statement = statement.order_by(rank.desc(), Outlet.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+def nearby_statement(latitude: float, longitude: float, radius_km: Optional[float] = None,
+                     k: Optional[int] = None) -> Tuple[TextClause, Dict[str, Any]]:
+    """Build the earthdistance nearby query and its parameters; see DatabaseManager.find_nearby_outlets()."""
+    params = {"lat": latitude, "lng": longitude}
+    if k is not None:
+        return _NEAREST_SQL, {**params, "k": k}
+    box_radius_m = radius_km * 1000.0 * EARTHDISTANCE_RADIUS_M / EARTH_RADIUS_M
+    return _NEARBY_WITHIN_RADIUS_SQL, {**params, "radius_km": radius_km, "box_radius_m": box_radius_m}
+
+def nearby_hits(rows, radius_km: Optional[float] = None) -> List[Tuple[int, float]]:
+    """Turn nearby query rows into (outlet_id, distance_km) pairs, dropping k-nearest rows beyond radius_km."""
+    hits = [(row.id, float(row.distance)) for row in rows]
+    return [hit for hit in hits if radius_km is None or hit[1] <= radius_km]
+
+def changes_statements(since: Optional[datetime], overlap: timedelta = timedelta(0), columns: Optional[List[str]] = None,
+                       include_hours: bool = True) -> Tuple[Select, Select]:
+    """
+    Build the delta sync queries: outlets updated and outlets deleted after `since - overlap`.
+    
+    With since=None every outlet is returned (initial sync) and the tombstone
+    query only serves to find the newest deletion for the next sync token.
+    """
+    upserted = outlet_fields_statement(columns, include_hours, include_nearest=columns is None).order_by(Outlet.id)
+    deleted = select(OutletTombstone.outlet_id, OutletTombstone.deleted_at).order_by(OutletTombstone.outlet_id)
+    if since is not None:
+        upserted = upserted.where(Outlet.updated_at > since - overlap)
+        deleted = deleted.where(OutletTombstone.deleted_at > since - overlap)
+    return upserted, deleted
+
+def outlet_changes(outlets: List[Outlet], tombstones, since: Optional[datetime]) -> Tuple[Optional[datetime], List[Outlet], List[int]]:
+    """
+    Combine delta sync query results into (high_water_mark, upserted_outlets, deleted_ids).
+    
+    The high-water mark is the newest updated_at/deleted_at seen, never older
+    than `since`. An ID that was deleted and then re-created is reported as
+    upserted only; a full sync (since=None) reports no deletions.
+    """
+    upserted_ids = {outlet.id for outlet in outlets}
+    deleted_ids = [outlet_id for outlet_id, _ in tombstones if outlet_id not in upserted_ids] if since is not None else []
+    timestamps = [outlet.updated_at for outlet in outlets if outlet.updated_at is not None]
+    timestamps += [deleted_at for _, deleted_at in tombstones]
+    if since is not None:
+        timestamps.append(since)
+    return max(timestamps, default=None), outlets, deleted_ids
+
+def _hours_signature(hours) -> List[Tuple]:
+    """Order-independent summary of an outlet's hours, given OperatingHours rows or scraper record dicts."""
+    def as_text(value):
+        return value.strftime('%H:%M:%S') if hasattr(value, 'strftime') else value
+    signature = []
+    for oh in hours:
+        values = oh if isinstance(oh, dict) else vars(oh)
+        signature.append((values.get('day_of_week'), as_text(values.get('opening_time')),
+                          as_text(values.get('closing_time')), bool(values.get('is_closed'))))
+    return sorted(signature, key=repr)
+
+# Callbacks notified (with the new version) after outlet data is committed in this process
+_data_version_listeners: List[Callable[[int], None]] = []
+
+def register_data_version_listener(listener: Callable[[int], None]):
+    """Register a callback to run after this process commits a new outlet data version."""
+    _data_version_listeners.append(listener)
+
+def _notify_data_version_listeners(version: int):
+    for listener in _data_version_listeners:
+        try:
+            listener(version)
+        except Exception as e:
+            logger.error(f"Data version listener failed: {e}")
+
 class DatabaseManager:
     """Manages database operations for Subway outlets and operating hours using SQLAlchemy."""
     
     def __init__(self, **connection_params):
-        """Initialize database connection parameters."""
-        db_url = f"postgresql://{connection_params.get('user')}:{connection_params.get('password')}@{connection_params.get('host')}:{connection_params.get('port')}/{connection_params.get('dbname')}"
-        self.engine = create_engine(db_url)
-        self.SessionFactory = sessionmaker(bind=self.engine)
+        """Initialize database connection parameters using the shared, pooled engine."""
+        self.engine = get_engine(connection_params)
+        self.SessionFactory = get_session_factory(connection_params)
         self.session = None
     
     def __enter__(self):
@@ -35,7 +196,9 @@ class DatabaseManager:
         logger.info("Created database tables")
     
     def connect(self):
-        """Establish connection to the database."""
+        """Establish connection to the database (reuses the open session if there is one)."""
+        if self.session:
+            return
         try:
             self.session = self.SessionFactory()
             logger.info("Successfully connected to the database")
@@ -50,6 +213,113 @@ class DatabaseManager:
             self.session = None
             logger.info("Database connection closed")
     
+    def query_outlets_with_hours(self) -> Query:
+        """
+        Build the shared outlet query with operating hours eagerly loaded.
+        
+        Hours are fetched with a single extra SELECT ... WHERE outlet_id IN (...)
+        per result set, so callers issue a constant number of queries no matter
+        how many outlets they return.
+        """
+        if not self.session:
+            self.connect()
+        return self.session.query(Outlet).options(selectinload(Outlet.operating_hours))
+    
+    def search_outlets(self, query_text: str, fuzzy: bool = False, columns: Optional[List[str]] = None,
+                       include_hours: bool = True, after: Optional[Tuple[float, int]] = None,
+                       limit: Optional[int] = None, outlet_ids: Optional[Set[int]] = None,
+                       include_nearest: bool = False) -> List[Tuple[Outlet, float]]:
+        """
+        Search outlets by name or address using the pg_trgm GIN indexes, best matches first.
+        
+        Args:
+            query_text: Text to search for
+            fuzzy: Match by trigram word similarity (typo tolerant) instead of substring
+            columns: Outlet columns to load, see outlet_fields_statement()
+            include_hours: Whether to eager-load operating hours
+            after: (rank, outlet_id) of the last result of the previous page
+            limit: Maximum number of results
+            outlet_ids: Only consider these outlets
+            include_nearest: Whether to eager-load the precomputed nearest neighbours
+            
+        Returns:
+            (outlet, rank) pairs ordered by rank descending, then outlet ID
+        """
+        if not self.session:
+            self.connect()
+        statement = search_statement(query_text, fuzzy=fuzzy, columns=columns, include_hours=include_hours,
+                                     after=after, limit=limit, outlet_ids=outlet_ids, include_nearest=include_nearest)
+        return [(outlet, float(outlet_rank)) for outlet, outlet_rank in self.session.execute(statement).all()]
+    
+    def find_nearby_outlets(self, latitude: float, longitude: float, radius_km: Optional[float] = None,
+                            k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find outlets near a point using the earthdistance GiST index.
+        
+        Args:
+            latitude: Latitude of the search point
+            longitude: Longitude of the search point
+            radius_km: Only return outlets within this many kilometers
+            k: Only return the k nearest outlets
+            
+        Returns:
+            (outlet_id, distance_km) pairs ordered by increasing distance
+        """
+        if not self.session:
+            self.connect()
+        statement, params = nearby_statement(latitude, longitude, radius_km=radius_km, k=k)
+        return nearby_hits(self.session.execute(statement, params).fetchall(), radius_km)
+    
+    def get_changes(self, since: Optional[datetime] = None, overlap: timedelta = timedelta(0)) -> Tuple[Optional[datetime], List[Outlet], List[int]]:
+        """
+        Outlets upserted and deleted since a point in time, for delta sync.
+        
+        Args:
+            since: Timestamp of the client's last sync (None for a full sync)
+            overlap: Extra look-back covering writes committed after `since` with an earlier timestamp
+            
+        Returns:
+            (high_water_mark, upserted_outlets, deleted_outlet_ids); see outlet_changes()
+        """
+        if not self.session:
+            self.connect()
+        upserted, deleted = changes_statements(since, overlap)
+        outlets = self.session.execute(upserted).scalars().all()
+        tombstones = self.session.execute(deleted).all()
+        return outlet_changes(outlets, tombstones, since)
+    
+    def get_data_version(self) -> int:
+        """Return the current outlet data version (0 if nothing has been written yet)."""
+        if not self.session:
+            self.connect()
+        version = self.session.query(DataVersion.version).filter(DataVersion.id == 1).scalar()
+        return version or 0
+    
+    def bump_data_version(self) -> int:
+        """
+        Increment the outlet data version within the current transaction.
+        
+        The row is locked until the caller commits, so concurrent writers are
+        serialized and each commit produces a distinct version.
+        
+        Returns:
+            The new data version
+        """
+        marker = self.session.query(DataVersion).filter(DataVersion.id == 1).with_for_update().first()
+        if marker is None:
+            marker = DataVersion(id=1, version=1)
+            self.session.add(marker)
+        else:
+            marker.version += 1
+        self.session.flush()
+        return marker.version
+    
+    def touch_outlets(self, outlet_ids: Set[int]):
+        """Set updated_at to now for the given outlets within the current transaction (e.g. after their hours change)."""
+        if outlet_ids:
+            self.session.query(Outlet).filter(Outlet.id.in_(outlet_ids)).update(
+                {Outlet.updated_at: func.now()}, synchronize_session=False)
+    
     def insert_outlets(self, outlets_data: List[Dict[str, Any]]) -> Dict[str, int]:
         """
         Insert outlets data into the outlets table.
@@ -95,7 +365,9 @@ class DatabaseManager:
                     self.session.flush()
                     outlet_ids[name] = new_outlet.id
             
+            version = self.bump_data_version()
             self.session.commit()
+            _notify_data_version_listeners(version)
             logger.info(f"Successfully inserted/updated {len(outlets_data)} outlets")
             
             return outlet_ids
@@ -128,6 +400,7 @@ class DatabaseManager:
                 outlet_hours[outlet_name].append(record)
             
             total_records = 0
+            changed_outlet_ids = set()
             
             # Process each outlet separately
             for outlet_name, records in outlet_hours.items():
@@ -137,7 +410,10 @@ class DatabaseManager:
                     
                 outlet_id = outlet_id_map[outlet_name]
                 
-                # Delete existing operating hours for this outlet
+                # Delete existing operating hours for this outlet, remembering whether they differ
+                existing = self.session.query(OperatingHours).filter(OperatingHours.outlet_id == outlet_id).all()
+                if _hours_signature(existing) != _hours_signature(records):
+                    changed_outlet_ids.add(outlet_id)
                 self.session.query(OperatingHours).filter(OperatingHours.outlet_id == outlet_id).delete()
                 
                 # Insert new operating hours
@@ -152,10 +428,57 @@ class DatabaseManager:
                     self.session.add(op_hour)
                     total_records += 1
             
+            # Re-inserting identical hours is not a change; only touched outlets show up in delta sync
+            self.touch_outlets(changed_outlet_ids)
+            version = self.bump_data_version()
             self.session.commit()
+            _notify_data_version_listeners(version)
             logger.info(f"Successfully inserted {total_records} operating hours records in total")
             return total_records
         except SQLAlchemyError as e:
             self.session.rollback()
             logger.error(f"Error inserting operating hours data: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def replace_outlet_neighbors(self, neighbors: List[Dict[str, Any]]) -> int:
+        """
+        Replace the outlet_neighbors table with freshly computed rows.
+        
+        Outlets whose neighbour list changed get their updated_at touched, so
+        delta sync clients pick up the new "nearest" values.
+        
+        Args:
+            neighbors: Dicts with outlet_id, rank, neighbor_id and distance_km
+            
+        Returns:
+            Number of outlets whose neighbours changed
+        """
+        if not self.session:
+            self.connect()
+        
+        def by_outlet(rows) -> Dict[int, List[Tuple[int, float]]]:
+            grouped = {}
+            for row in sorted(rows, key=lambda row: (row['outlet_id'], row['rank'])):
+                grouped.setdefault(row['outlet_id'], []).append((row['neighbor_id'], round(row['distance_km'], 6)))
+            return grouped
+            
+        try:
+            existing = self.session.execute(select(
+                OutletNeighbor.outlet_id, OutletNeighbor.rank, OutletNeighbor.neighbor_id, OutletNeighbor.distance_km
+            )).mappings().all()
+            old, new = by_outlet(existing), by_outlet(neighbors)
+            changed_outlet_ids = {outlet_id for outlet_id in old.keys() | new.keys() if old.get(outlet_id) != new.get(outlet_id)}
+            
+            self.session.query(OutletNeighbor).delete(synchronize_session=False)
+            if neighbors:
+                self.session.execute(insert(OutletNeighbor), neighbors)
+            self.touch_outlets(changed_outlet_ids)
+            version = self.bump_data_version()
+            self.session.commit()
+            _notify_data_version_listeners(version)
+            logger.info(f"Replaced outlet neighbours: {len(neighbors)} rows, {len(changed_outlet_ids)} outlets changed")
+            return len(changed_outlet_ids)
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Error replacing outlet neighbours: {e}")
+            raise
@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from server.config import DB_CONFIG, DB_POOL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class PoolStats:
+    """Thread-safe counters describing how connections are checked out of a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait_seconds: float, timed_out: bool = False):
+        """Record one checkout attempt and how long it waited for a connection."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait_seconds
+            self.max_wait = max(self.max_wait, wait_seconds)
+
+    def record_checkin(self):
+        """Record a connection being returned to the pool."""
+        with self._lock:
+            self.checkins += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters as a plain dictionary."""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+class _PoolInstrumentation:
+    """Pool mixin that records checkout counts and the time spent waiting for a connection."""
+
+    def __init__(self, creator, **kw):
+        super().__init__(creator, **kw)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # Keep counting across pool recreation (e.g. after a disconnect invalidates the pool)
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def _do_return_conn(self, record):
+        self.stats.record_checkin()
+        super()._do_return_conn(record)
+
+class InstrumentedQueuePool(_PoolInstrumentation, QueuePool):
+    """QueuePool that records checkout counts and the time spent waiting for a connection."""
+
+class InstrumentedAsyncQueuePool(_PoolInstrumentation, AsyncAdaptedQueuePool):
+    """Pool of the async engine, instrumented like InstrumentedQueuePool."""
+
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[Engine, sessionmaker] = {}
+_async_engines: Dict[str, AsyncEngine] = {}
+_async_session_factories: Dict[AsyncEngine, sessionmaker] = {}
+_registry_lock = threading.Lock()
+
+def build_db_url(connection_params: Dict[str, Any], driver: str = "postgresql") -> str:
+    """Build a PostgreSQL connection URL from DB_CONFIG-style parameters."""
+    return f"{driver}://{connection_params.get('user')}:{connection_params.get('password')}@{connection_params.get('host')}:{connection_params.get('port')}/{connection_params.get('dbname')}"
+
+def get_engine(connection_params: Optional[Dict[str, Any]] = None) -> Engine:
+    """
+    Return the process-wide engine for the given connection parameters.
+
+    The engine (and its connection pool) is created on first use and shared by
+    every caller afterwards, so the API routers, the chatbot and the scraper
+    all draw connections from the same pool.
+
+    Args:
+        connection_params: DB_CONFIG-style parameters, defaults to DB_CONFIG
+
+    Returns:
+        Shared SQLAlchemy engine
+    """
+    db_url = build_db_url(connection_params or DB_CONFIG)
+    with _registry_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url, poolclass=InstrumentedQueuePool, **DB_POOL_CONFIG)
+            _engines[db_url] = engine
+            logger.info(f"Created shared database engine (pool_size={DB_POOL_CONFIG['pool_size']}, max_overflow={DB_POOL_CONFIG['max_overflow']})")
+        return engine
+
+def get_session_factory(connection_params: Optional[Dict[str, Any]] = None) -> sessionmaker:
+    """Return the shared session factory bound to the engine for the given connection parameters."""
+    engine = get_engine(connection_params)
+    with _registry_lock:
+        factory = _session_factories.get(engine)
+        if factory is None:
+            factory = sessionmaker(bind=engine)
+            _session_factories[engine] = factory
+        return factory
+
+def get_async_engine(connection_params: Optional[Dict[str, Any]] = None) -> AsyncEngine:
+    """
+    Return the process-wide asyncio engine (asyncpg driver) for the given connection parameters.
+
+    It has its own pool, sized by the same DB_POOL_CONFIG as the sync engine.
+
+    Args:
+        connection_params: DB_CONFIG-style parameters, defaults to DB_CONFIG
+
+    Returns:
+        Shared SQLAlchemy AsyncEngine
+    """
+    db_url = build_db_url(connection_params or DB_CONFIG, driver="postgresql+asyncpg")
+    with _registry_lock:
+        engine = _async_engines.get(db_url)
+        if engine is None:
+            engine = create_async_engine(db_url, poolclass=InstrumentedAsyncQueuePool, **DB_POOL_CONFIG)
+            _async_engines[db_url] = engine
+            logger.info(f"Created shared async database engine (pool_size={DB_POOL_CONFIG['pool_size']}, max_overflow={DB_POOL_CONFIG['max_overflow']})")
+        return engine
+
+def get_async_session_factory(connection_params: Optional[Dict[str, Any]] = None) -> sessionmaker:
+    """Return the shared AsyncSession factory bound to the async engine for the given connection parameters."""
+    engine = get_async_engine(connection_params)
+    with _registry_lock:
+        factory = _async_session_factories.get(engine)
+        if factory is None:
+            factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+            _async_session_factories[engine] = factory
+        return factory
+
+def _describe_pool(pool: Pool) -> Dict[str, Any]:
+    stats = {
+        "pool_size": pool.size(),
+        "max_overflow": DB_POOL_CONFIG["max_overflow"],
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, _PoolInstrumentation):
+        stats.update(pool.stats.as_dict())
+    return stats
+
+def get_pool_stats(connection_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Describe the current state of the shared connection pools.
+
+    Returns:
+        Pool configuration, live occupancy and cumulative checkout/wait statistics
+        of the sync pool, with the async engine's pool under "async" once it exists
+    """
+    stats = _describe_pool(get_engine(connection_params).pool)
+    async_engine = _async_engines.get(build_db_url(connection_params or DB_CONFIG, driver="postgresql+asyncpg"))
+    if async_engine is not None:
+        stats["async"] = _describe_pool(async_engine.sync_engine.pool)
+    return stats
+
+def dispose_engines():
+    """Close every pooled connection held by the shared engines."""
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_factories.clear()
+
+async def dispose_async_engines():
+    """Close every pooled connection held by the shared async engines."""
+    with _registry_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+        _async_session_factories.clear()
+    for engine in engines:
+        await engine.dispose()
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey, DateTime, Text, Time
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey, DateTime, Text, Time, Float, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -15,7 +16,22 @@ class Outlet(Base):
     latitude = Column(Numeric(10, 8))  # Changed from Float to Numeric(10, 8)
     longitude = Column(Numeric(11, 8))  # Changed from Float to Numeric(11, 8)
     created_at = Column(DateTime(timezone=True), server_default=func.now())  # Added timezone
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # Added timezone
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)  # Added timezone; indexed for /outlets/changes
+    
+    # Lazy by default; list endpoints eager-load it via DatabaseManager.query_outlets_with_hours()
+    operating_hours = relationship(
+        "OperatingHours",
+        back_populates="outlet",
+        order_by="OperatingHours.id",
+        passive_deletes=True,
+    )
+    # Precomputed k nearest other outlets, nearest first (see services/outlet_neighbors.py)
+    nearest_neighbors = relationship(
+        "OutletNeighbor",
+        foreign_keys="OutletNeighbor.outlet_id",
+        order_by="OutletNeighbor.rank",
+        viewonly=True,
+    )
     
     def __repr__(self):
         return f"<Outlet(name='{self.name}', address='{self.address}')>"
@@ -31,7 +47,88 @@ class OperatingHours(Base):
     is_closed = Column(Boolean, default=False)
     # Removed created_at and updated_at columns since they're not in your database
     
+    outlet = relationship("Outlet", back_populates="operating_hours")
+    
     def __repr__(self):
         if self.is_closed:
             return f"<OperatingHours(day='{self.day_of_week}', closed=True)>"
-        return f"<OperatingHours(day='{self.day_of_week}', hours='{self.opening_time}-{self.closing_time}')>"
\ No newline at end of file
+        return f"<OperatingHours(day='{self.day_of_week}', hours='{self.opening_time}-{self.closing_time}')>"
+
+class DataVersion(Base):
+    """Single-row marker bumped whenever outlet or operating hours data is written."""
+    __tablename__ = 'data_version'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<DataVersion(version={self.version})>"
+
+class OutletNeighbor(Base):
+    """One of an outlet's k nearest other outlets, rebuilt after each scraper or operating hours run."""
+    __tablename__ = 'outlet_neighbors'
+    
+    outlet_id = Column(Integer, ForeignKey('outlets.id', ondelete='CASCADE'), primary_key=True)
+    rank = Column(Integer, primary_key=True)  # 1 = nearest
+    neighbor_id = Column(Integer, ForeignKey('outlets.id', ondelete='CASCADE'), nullable=False, index=True)
+    distance_km = Column(Float, nullable=False)  # Great-circle distance
+    
+    def __repr__(self):
+        return f"<OutletNeighbor(outlet_id={self.outlet_id}, rank={self.rank}, neighbor_id={self.neighbor_id}, distance_km={self.distance_km:.3f})>"
+
+class OutletTombstone(Base):
+    """Record of a deleted outlet, so delta sync clients learn about the deletion."""
+    __tablename__ = 'outlet_tombstones'
+    
+    outlet_id = Column(Integer, primary_key=True)  # No foreign key: the outlet row is gone
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<OutletTombstone(outlet_id={self.outlet_id}, deleted_at='{self.deleted_at}')>"
+
+# Tombstones are written by a trigger on outlets so every delete path (ORM, scripts, psql) is covered.
+# plpgsql resolves outlet_tombstones at call time, so table creation order does not matter.
+# Mirrors the c4a91f2d7e60 migration for databases created through create_all().
+OUTLET_TOMBSTONE_TRIGGER = [
+    DDL("""
+        CREATE OR REPLACE FUNCTION record_outlet_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO outlet_tombstones (outlet_id, deleted_at) VALUES (OLD.id, now())
+            ON CONFLICT (outlet_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    """),
+    DDL("DROP TRIGGER IF EXISTS outlets_tombstone ON outlets"),
+    DDL("""
+        CREATE TRIGGER outlets_tombstone AFTER DELETE ON outlets
+        FOR EACH ROW EXECUTE FUNCTION record_outlet_tombstone()
+    """),
+]
+for ddl in OUTLET_TOMBSTONE_TRIGGER:
+    event.listen(Outlet.__table__, "after_create", ddl.execute_if(dialect="postgresql"))
+
+
+# earthdistance represents points as cubes; the GiST expression index backs the nearby queries and
+# the chatbot's distance prompt. Mirrors the 8e4f2b6c1d93 migration for databases created through create_all().
+OUTLET_EARTHDISTANCE_INDEX = [
+    DDL("CREATE EXTENSION IF NOT EXISTS cube"),
+    DDL("CREATE EXTENSION IF NOT EXISTS earthdistance"),
+    DDL("""
+        CREATE INDEX IF NOT EXISTS ix_outlets_earth_location ON outlets
+        USING gist (ll_to_earth(latitude::float8, longitude::float8))
+    """),
+]
+for ddl in OUTLET_EARTHDISTANCE_INDEX:
+    event.listen(Outlet.__table__, "after_create", ddl.execute_if(dialect="postgresql"))
+
+# Trigram indexes behind /outlets/search (ILIKE and the word_similarity() <% operator).
+# Mirrors the b71a0c4e93f5 migration for databases created through create_all().
+OUTLET_TRIGRAM_INDEXES = [
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+    DDL("CREATE INDEX IF NOT EXISTS ix_outlets_name_trgm ON outlets USING gin (name gin_trgm_ops)"),
+    DDL("CREATE INDEX IF NOT EXISTS ix_outlets_address_trgm ON outlets USING gin (address gin_trgm_ops)"),
+]
+for ddl in OUTLET_TRIGRAM_INDEXES:
+    event.listen(Outlet.__table__, "after_create", ddl.execute_if(dialect="postgresql"))
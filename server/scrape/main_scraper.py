@@ -14,6 +14,7 @@ import time
 from server.scrape.geocoding import geocode_address_google
 from server.scrape.process_operating_hours import process_operating_hours
 from server.db.db_manager import DatabaseManager
+from server.services.outlet_neighbors import rebuild_outlet_neighbors
 
 from server.config import DB_CONFIG, SCRAPER_CONFIG
 
@@ -134,6 +135,9 @@ def save_to_database(outlets_data, operating_hours_data):
         if operating_hours_data:
             db_manager.insert_operating_hours(operating_hours_data, outlet_id_map)
         
+        # Coordinates may have changed, so recompute every outlet's nearest neighbours
+        rebuild_outlet_neighbors(db_manager)
+        
         logger.info("Successfully saved all data to the database")
     except Exception as e:
         logger.error(f"Error saving data to database: {e}")
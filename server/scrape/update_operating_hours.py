@@ -12,8 +12,9 @@ sys.path.append(str(project_root))
 sys.path.append(str(server_dir))
 
 import logging
-from db.db_manager import DatabaseManager
-from db.models import Outlet, OperatingHours
+from server.db.db_manager import DatabaseManager
+from server.db.models import Outlet, OperatingHours
+from server.services.outlet_neighbors import rebuild_outlet_neighbors
 from process_operating_hours import process_operating_hours
 
 # Import config from project root
@@ -59,9 +60,14 @@ def update_operating_hours():
             
             logger.info(f"Processed {len(processed_hours)} hour records for {outlet_name}")
             
-        # Delete existing operating hours
-        db_manager.session.query(OperatingHours).delete()
-        logger.info("Deleted existing operating hours records")
+        # Delete operating hours of outlets that get no new ones; insert_operating_hours()
+        # replaces the rest outlet by outlet, so unchanged outlets keep their updated_at
+        refreshed_ids = {outlet_id_map[record['outlet_name']] for record in operating_hours_data}
+        stale = db_manager.session.query(OperatingHours).filter(~OperatingHours.outlet_id.in_(refreshed_ids))
+        stale_outlet_ids = {outlet_id for (outlet_id,) in stale.with_entities(OperatingHours.outlet_id).distinct()}
+        stale.delete(synchronize_session=False)
+        db_manager.touch_outlets(stale_outlet_ids)
+        logger.info(f"Deleted existing operating hours records of {len(stale_outlet_ids)} outlets without new hours")
             
         # Insert operating hours
         total_records = db_manager.insert_operating_hours(operating_hours_data, outlet_id_map)
@@ -71,6 +77,9 @@ def update_operating_hours():
         
         logger.info(f"Successfully inserted {total_records} operating hours records")
         
+        # Refresh the precomputed nearest-neighbour table alongside the hours
+        rebuild_outlet_neighbors(db_manager)
+        
     except Exception as e:
         logger.error(f"Error updating operating hours: {e}")
         db_manager.session.rollback()
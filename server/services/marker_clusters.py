@@ -0,0 +1,95 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+from server.services.outlet_snapshot import OutletSnapshot
+from server.services.spatial_index import get_spatial_index
+
+logger = logging.getLogger(__name__)
+
+# Zoom levels up to and including this one are clustered; above it individual outlets are returned
+MAX_CLUSTER_ZOOM = 11
+# Clusters are built on a grid of CLUSTER_CELL_PX x CLUSTER_CELL_PX screen pixels (256 px Web Mercator tiles)
+TILE_SIZE_PX = 256
+CLUSTER_CELL_PX = 64
+MAX_MERCATOR_LAT = 85.05112878
+
+@dataclass(frozen=True)
+class ZoomClusters:
+    """Grid clusters for one zoom level, stored as parallel arrays."""
+    latitudes: np.ndarray  # Cluster centroids
+    longitudes: np.ndarray
+    counts: np.ndarray
+    first_outlet_ids: np.ndarray  # For single-outlet cells, the outlet itself
+
+def mercator_xy(latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Project coordinates onto the unit Web Mercator square ([0, 1) in both axes, y growing southwards)."""
+    lat = np.radians(np.clip(latitudes, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (longitudes + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+class MarkerClusterIndex:
+    """
+    Precomputed grid clusters of outlet markers for every clustered zoom level.
+
+    Built once per snapshot, so viewport queries only filter a few hundred
+    cluster centroids instead of re-clustering outlets on each pan or zoom.
+    """
+
+    def __init__(self, outlet_ids: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray,
+                 max_zoom: int = MAX_CLUSTER_ZOOM):
+        self.max_zoom = max_zoom
+        self.levels: Dict[int, ZoomClusters] = {}
+        x, y = mercator_xy(latitudes, longitudes)
+        for zoom in range(max_zoom + 1):
+            cells_per_axis = (TILE_SIZE_PX << zoom) // CLUSTER_CELL_PX
+            keys = np.floor(y * cells_per_axis).astype(np.int64) * cells_per_axis + np.floor(x * cells_per_axis).astype(np.int64)
+            _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+            self.levels[zoom] = ZoomClusters(
+                latitudes=np.bincount(inverse, weights=latitudes) / counts,
+                longitudes=np.bincount(inverse, weights=longitudes) / counts,
+                counts=counts,
+                first_outlet_ids=outlet_ids[first],
+            )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OutletSnapshot) -> "MarkerClusterIndex":
+        """Cluster every outlet with coordinates in the snapshot."""
+        start = time.perf_counter()
+        spatial_index = get_spatial_index(snapshot)
+        index = cls(spatial_index.outlet_ids, spatial_index.latitudes, spatial_index.longitudes)
+        logger.info(f"Built marker clusters v{snapshot.version} for zooms 0-{index.max_zoom} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return index
+
+    def in_bounds(self, zoom: int, south: float, west: float, north: float, east: float) -> Tuple[List[dict], List[int]]:
+        """
+        Return the clusters whose centroid falls inside a box at the given zoom.
+
+        Cells holding a single outlet are returned as that outlet's ID rather than as a cluster.
+
+        Returns:
+            (clusters, outlet_ids) where each cluster is {"latitude", "longitude", "count"}
+        """
+        level = self.levels[min(zoom, self.max_zoom)]
+        lng_mask = (level.longitudes >= west) & (level.longitudes <= east) if west <= east \
+            else (level.longitudes >= west) | (level.longitudes <= east)
+        mask = lng_mask & (level.latitudes >= south) & (level.latitudes <= north)
+
+        clusters, outlet_ids = [], []
+        for i in np.flatnonzero(mask):
+            if level.counts[i] == 1:
+                outlet_ids.append(int(level.first_outlet_ids[i]))
+            else:
+                clusters.append({
+                    "latitude": float(level.latitudes[i]),
+                    "longitude": float(level.longitudes[i]),
+                    "count": int(level.counts[i]),
+                })
+        return clusters, outlet_ids
+
+def get_marker_clusters(snapshot: OutletSnapshot) -> MarkerClusterIndex:
+    """Return the marker clusters for a snapshot, building them once per data version."""
+    return snapshot.derived("marker_clusters", MarkerClusterIndex.from_snapshot)
@@ -0,0 +1,162 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+import numpy as np
+from server.config import OUTLET_TIMEZONE
+from server.services.outlet_snapshot import OutletSnapshot
+
+logger = logging.getLogger(__name__)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {day: index for index, day in enumerate(DAYS)}
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+outlet_tz = ZoneInfo(OUTLET_TIMEZONE)
+
+def to_outlet_time(at: Optional[datetime] = None) -> datetime:
+    """Express a moment in the outlets' timezone (naive datetimes are taken to be local already; None means now)."""
+    if at is None:
+        return datetime.now(outlet_tz)
+    if at.tzinfo is None:
+        return at.replace(tzinfo=outlet_tz)
+    return at.astimezone(outlet_tz)
+
+def minute_of_week(at: datetime) -> int:
+    """Minutes since Monday 00:00 for a local datetime."""
+    return at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+
+@dataclass(frozen=True)
+class OpenStatus:
+    """Whether an outlet is open at a moment, and when that next changes."""
+    outlet_id: int
+    is_open: bool
+    opens_at: Optional[datetime]  # Next opening time if currently closed
+    closes_at: Optional[datetime]  # Next closing time if currently open (None when open around the clock)
+
+class OpeningHoursIndex:
+    """
+    Operating hours of every outlet as sorted minute-of-week intervals.
+
+    Each OperatingHours row becomes a [start, end) interval in minutes since
+    Monday 00:00. Ranges that close after midnight run into the next day, and
+    Sunday-night ranges wrap around to Monday morning. Rows for days other than
+    Monday-Sunday (e.g. "Public Holiday") are ignored.
+    """
+
+    def __init__(self, snapshot: OutletSnapshot):
+        self.outlet_ids = np.asarray([outlet.id for outlet in snapshot.outlets], dtype=np.int64)
+
+        starts, ends, positions = [], [], []
+        for position, outlet in enumerate(snapshot.outlets):
+            for start, end in self._outlet_intervals(outlet.operating_hours):
+                starts.append(start)
+                ends.append(end)
+                positions.append(position)
+
+        order = np.argsort(np.asarray(starts, dtype=np.int64), kind="stable")
+        self.starts = np.asarray(starts, dtype=np.int64)[order]
+        self.ends = np.asarray(ends, dtype=np.int64)[order]
+        self.positions = np.asarray(positions, dtype=np.int64)[order]
+
+        # An interval ending at the end of the week continues into the outlet's interval starting Monday 00:00
+        monday_ends = np.full(len(self.outlet_ids), -1, dtype=np.int64)
+        at_week_start = self.starts == 0
+        monday_ends[self.positions[at_week_start]] = self.ends[at_week_start]
+        continues = (self.ends == MINUTES_PER_WEEK) & (monday_ends[self.positions] >= 0)
+        self.close_minutes = np.where(continues, MINUTES_PER_WEEK + monday_ends[self.positions], self.ends)
+        # Outlets open around the clock never close
+        always_open = np.zeros(len(self.outlet_ids), dtype=bool)
+        full_week = (self.starts == 0) & (self.ends == MINUTES_PER_WEEK)
+        always_open[self.positions[full_week]] = True
+        self.always_open = always_open
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OutletSnapshot) -> "OpeningHoursIndex":
+        """Build the interval index for every outlet in the snapshot."""
+        start = time.perf_counter()
+        index = cls(snapshot)
+        logger.info(f"Built opening hours index v{snapshot.version} with {len(index.starts)} intervals in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return index
+
+    @staticmethod
+    def _outlet_intervals(operating_hours) -> List[List[int]]:
+        """Convert one outlet's hours into merged, non-overlapping minute-of-week intervals."""
+        intervals = []
+        for oh in operating_hours:
+            day = DAY_INDEX.get(oh.day_of_week)
+            if day is None or oh.is_closed or oh.opening_time is None or oh.closing_time is None:
+                continue
+            opening = oh.opening_time.hour * 60 + oh.opening_time.minute
+            closing = oh.closing_time.hour * 60 + oh.closing_time.minute
+            if closing <= opening:
+                closing += MINUTES_PER_DAY  # Closes after midnight (equal times mean open 24 hours)
+            start = day * MINUTES_PER_DAY + opening
+            end = day * MINUTES_PER_DAY + closing
+            if end > MINUTES_PER_WEEK:
+                intervals.append([start, MINUTES_PER_WEEK])
+                intervals.append([0, end - MINUTES_PER_WEEK])
+            else:
+                intervals.append([start, end])
+
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _open_mask(self, minute: int) -> np.ndarray:
+        """Mask over intervals that contain the given minute of the week."""
+        # Intervals are sorted by start, so only those starting at or before the minute can contain it
+        candidates = np.searchsorted(self.starts, minute, side="right")
+        mask = np.zeros(len(self.starts), dtype=bool)
+        mask[:candidates] = self.ends[:candidates] > minute
+        return mask
+
+    def open_outlet_ids(self, at: Optional[datetime] = None) -> Set[int]:
+        """IDs of outlets open at the given moment (default: now)."""
+        minute = minute_of_week(to_outlet_time(at))
+        return {int(outlet_id) for outlet_id in self.outlet_ids[self.positions[self._open_mask(minute)]]}
+
+    def statuses(self, at: Optional[datetime] = None) -> Dict[int, OpenStatus]:
+        """
+        Open/closed status and next opening or closing time for every outlet, computed in one vectorized pass.
+
+        Outlets without any usable hours are reported closed with no opening time.
+        """
+        local = to_outlet_time(at).replace(second=0, microsecond=0)
+        minute = minute_of_week(local)
+        outlet_count = len(self.outlet_ids)
+        no_change = np.iinfo(np.int64).max
+
+        open_mask = self._open_mask(minute)
+        is_open = np.zeros(outlet_count, dtype=bool)
+        is_open[self.positions[open_mask]] = True
+
+        # Minutes until the containing interval closes, for open outlets
+        minutes_to_close = np.full(outlet_count, no_change, dtype=np.int64)
+        np.minimum.at(minutes_to_close, self.positions[open_mask], self.close_minutes[open_mask] - minute)
+
+        # Minutes until the next interval starts (wrapping into next week), for closed outlets
+        minutes_to_open = np.full(outlet_count, no_change, dtype=np.int64)
+        np.minimum.at(minutes_to_open, self.positions, (self.starts - minute) % MINUTES_PER_WEEK)
+
+        statuses = {}
+        for position, outlet_id in enumerate(self.outlet_ids):
+            opens_at = closes_at = None
+            if is_open[position]:
+                if not self.always_open[position]:
+                    closes_at = local + timedelta(minutes=int(minutes_to_close[position]))
+            elif minutes_to_open[position] != no_change:
+                opens_at = local + timedelta(minutes=int(minutes_to_open[position]))
+            statuses[int(outlet_id)] = OpenStatus(int(outlet_id), bool(is_open[position]), opens_at, closes_at)
+        return statuses
+
+def get_opening_hours_index(snapshot: OutletSnapshot) -> OpeningHoursIndex:
+    """Return the opening hours index for a snapshot, building it once per data version."""
+    return snapshot.derived("opening_hours_index", OpeningHoursIndex.from_snapshot)
@@ -0,0 +1,49 @@
+import logging
+import time
+from typing import Any, Dict, List
+import numpy as np
+from server.config import GEO_CONFIG
+from server.db.db_manager import DatabaseManager
+from server.db.models import Outlet
+from server.services.spatial_index import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+def compute_outlet_neighbors(index: SpatialIndex, k: int) -> List[Dict[str, Any]]:
+    """Rows for the outlet_neighbors table: the k nearest other outlets of every outlet in the index."""
+    sources, targets, distances = index.nearest_table(k)
+    # Rows are grouped by source and ordered by distance, so the rank is the offset within the group
+    ranks = np.arange(len(sources)) - np.searchsorted(sources, sources, side="left") + 1
+    return [
+        {
+            "outlet_id": int(index.outlet_ids[source]),
+            "rank": int(rank),
+            "neighbor_id": int(index.outlet_ids[target]),
+            "distance_km": float(distance),
+        }
+        for source, target, distance, rank in zip(sources, targets, distances, ranks)
+    ]
+
+def rebuild_outlet_neighbors(db_manager: DatabaseManager, k: int = GEO_CONFIG["nearest_k"]) -> int:
+    """
+    Recompute every outlet's k nearest neighbours from the outlets table and store them.
+
+    Run after the scraper or update_operating_hours.py has written outlet data.
+
+    Returns:
+        Number of outlets whose neighbours changed
+    """
+    if not db_manager.session:
+        db_manager.connect()
+    start = time.perf_counter()
+    located = db_manager.session.query(Outlet.id, Outlet.latitude, Outlet.longitude).filter(
+        Outlet.latitude.isnot(None), Outlet.longitude.isnot(None)
+    ).all()
+    index = SpatialIndex(
+        (outlet_id for outlet_id, _, _ in located),
+        (float(latitude) for _, latitude, _ in located),
+        (float(longitude) for _, _, longitude in located),
+    )
+    neighbors = compute_outlet_neighbors(index, k)
+    logger.info(f"Computed {len(neighbors)} nearest-neighbour rows for {len(index)} outlets in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return db_manager.replace_outlet_neighbors(neighbors)
@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import logging
+import time
+import orjson
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+from pydantic import TypeAdapter
+from server.api.models import outlet as outlet_models
+from server.services.outlet_snapshot import OutletSnapshot
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_outlet_list_adapter = TypeAdapter(List[outlet_models.OutletResponse])
+
+@dataclass(frozen=True)
+class PrecompressedPayload:
+    """A serialized JSON body stored alongside its gzip/brotli encodings and strong ETag."""
+    version: int
+    etag: str
+    body: bytes
+    gzip_body: bytes
+    brotli_body: Optional[bytes]
+
+def build_payload(version: int, body: bytes) -> PrecompressedPayload:
+    """Compress a JSON body once and derive a strong ETag from its content."""
+    start = time.perf_counter()
+    payload = PrecompressedPayload(
+        version=version,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+        brotli_body=brotli.compress(body, quality=11) if brotli else None,
+    )
+    logger.info(
+        f"Built payload v{version}: {len(body)} bytes raw, {len(payload.gzip_body)} gzip, "
+        f"{len(payload.brotli_body) if payload.brotli_body else '-'} brotli in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return payload
+
+def _build_all_outlets_payload(snapshot: OutletSnapshot) -> PrecompressedPayload:
+    return build_payload(snapshot.version, _outlet_list_adapter.dump_json(list(snapshot.outlets)))
+
+def get_all_outlets_payload(snapshot: OutletSnapshot) -> PrecompressedPayload:
+    """Return the precompressed GET /outlets body for a snapshot, building it once per data version."""
+    return snapshot.derived("all_outlets_payload", _build_all_outlets_payload)
+
+def _build_outlet_records(snapshot: OutletSnapshot) -> Mapping[int, Dict[str, Any]]:
+    start = time.perf_counter()
+    # One pydantic pass over every outlet yields JSON-ready dicts (times already ISO strings)
+    records = _outlet_list_adapter.dump_python(list(snapshot.outlets), mode="json")
+    logger.info(f"Built {len(records)} outlet records v{snapshot.version} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return MappingProxyType({record["id"]: record for record in records})
+
+def get_outlet_records(snapshot: OutletSnapshot) -> Mapping[int, Dict[str, Any]]:
+    """
+    Return every outlet of a snapshot as a JSON-ready dict keyed by ID, built once per data version.
+
+    Endpoints serve these straight through orjson instead of rebuilding and
+    re-validating OutletResponse objects on every request. Treat them as read-only.
+    """
+    return snapshot.derived("outlet_records", _build_outlet_records)
+
+def _build_outlet_fragments(snapshot: OutletSnapshot) -> Mapping[int, bytes]:
+    start = time.perf_counter()
+    fragments = {outlet_id: orjson.dumps(record) for outlet_id, record in get_outlet_records(snapshot).items()}
+    logger.info(f"Built {len(fragments)} outlet fragments v{snapshot.version} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return MappingProxyType(fragments)
+
+def get_outlet_fragments(snapshot: OutletSnapshot) -> Mapping[int, bytes]:
+    """Return every outlet of a snapshot serialized as a JSON object, keyed by ID, built once per data version."""
+    return snapshot.derived("outlet_fragments", _build_outlet_fragments)
+
+def join_fragments(fragments: Iterable[bytes]) -> bytes:
+    """Assemble serialized outlets into a JSON array without re-serializing them."""
+    return b"[" + b",".join(fragments) + b"]"
+
+def with_distance(fragment: bytes, distance: float) -> bytes:
+    """Append a "distance" member to a serialized outlet object."""
+    return fragment[:-1] + b',"distance":' + orjson.dumps(distance) + b"}"
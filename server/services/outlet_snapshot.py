@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, TypeVar
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import selectinload
+from server.api.models import outlet as outlet_models
+from server.config import DB_CONFIG, SNAPSHOT_CONFIG
+from server.db.db_manager import DatabaseManager, register_data_version_listener
+from server.db.models import Outlet
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+_MISSING = object()
+
+@dataclass(frozen=True)
+class OutletSnapshot:
+    """Immutable, in-memory copy of every outlet and its operating hours at one data version."""
+    version: int
+    outlets: Tuple[outlet_models.OutletResponse, ...]  # Ordered by outlet ID
+    by_id: Mapping[int, outlet_models.OutletResponse]
+    loaded_at: float
+    _derived: Dict[str, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _derived_lock: Any = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    def get(self, outlet_id: int) -> Optional[outlet_models.OutletResponse]:
+        """Look up an outlet by ID."""
+        return self.by_id.get(outlet_id)
+
+    def derived(self, key: str, builder: Callable[["OutletSnapshot"], T]) -> T:
+        """
+        Return a value computed from this snapshot, building it at most once.
+        
+        Payloads and indexes derived from the outlet data are attached to the
+        snapshot they were built from, so they are discarded together with it
+        when the data version changes.
+        """
+        value = self._derived.get(key, _MISSING)
+        if value is _MISSING:
+            with self._derived_lock:
+                value = self._derived.get(key, _MISSING)
+                if value is _MISSING:
+                    value = builder(self)
+                    self._derived[key] = value
+        return value
+
+class OutletSnapshotStore:
+    """
+    Serves outlet reads from an in-process snapshot that is swapped atomically on data changes.
+    
+    Writes made by this process (DatabaseManager.insert_outlets / insert_operating_hours)
+    invalidate the snapshot immediately. Writes made by other processes (the scraper,
+    update_operating_hours.py) are picked up by re-reading the data_version marker at
+    most once per version_check_interval seconds.
+    """
+    
+    def __init__(self, version_check_interval: float = SNAPSHOT_CONFIG["version_check_interval"]):
+        self.version_check_interval = version_check_interval
+        self._snapshot: Optional[OutletSnapshot] = None
+        self._last_check = 0.0
+        self._stale = False
+        self._lock = threading.Lock()
+    
+    def fresh(self) -> Optional[OutletSnapshot]:
+        """Return the current snapshot if it can be served without checking the data version, else None."""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale and time.monotonic() - self._last_check < self.version_check_interval:
+            return snapshot
+        return None
+    
+    def get(self) -> OutletSnapshot:
+        """Return the current snapshot, reloading it first if the data version has moved on."""
+        snapshot = self.fresh()
+        if snapshot is not None:
+            return snapshot
+        
+        with self._lock:
+            # Another thread may have refreshed the snapshot while we waited for the lock
+            snapshot = self.fresh()
+            if snapshot is not None:
+                return snapshot
+            snapshot = self._snapshot
+            
+            with DatabaseManager(**DB_CONFIG) as db_manager:
+                # Stale flag is cleared before reading so a write landing mid-load re-marks it
+                self._stale = False
+                version = db_manager.get_data_version()
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(db_manager, version)
+                    self._snapshot = snapshot
+            self._last_check = time.monotonic()
+            return snapshot
+    
+    def invalidate(self, version: Optional[int] = None):
+        """Mark the snapshot stale so the next read reloads it."""
+        self._stale = True
+    
+    def _load(self, db_manager: DatabaseManager, version: int) -> OutletSnapshot:
+        start = time.perf_counter()
+        query = db_manager.query_outlets_with_hours().options(selectinload(Outlet.nearest_neighbors))
+        outlets = tuple(
+            outlet_models.to_outlet_response(outlet, include_nearest=True)
+            for outlet in query.order_by(Outlet.id).all()
+        )
+        snapshot = OutletSnapshot(
+            version=version,
+            outlets=outlets,
+            by_id=MappingProxyType({outlet.id: outlet for outlet in outlets}),
+            loaded_at=time.time(),
+        )
+        logger.info(f"Loaded outlet snapshot v{version} with {len(outlets)} outlets in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return snapshot
+
+outlet_snapshot_store = OutletSnapshotStore()
+register_data_version_listener(outlet_snapshot_store.invalidate)
+
+async def get_outlet_snapshot() -> OutletSnapshot:
+    """
+    FastAPI dependency returning the current outlet snapshot.
+    
+    The common case returns straight from memory on the event loop; version
+    checks and reloads use the blocking DatabaseManager, so they run in the threadpool.
+    """
+    snapshot = outlet_snapshot_store.fresh()
+    if snapshot is None:
+        snapshot = await run_in_threadpool(outlet_snapshot_store.get)
+    return snapshot
@@ -0,0 +1,88 @@
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from server.config import GEO_CONFIG
+from server.services.outlet_payload import PrecompressedPayload, build_payload
+from server.services.outlet_snapshot import OutletSnapshot
+from server.services.spatial_index import SpatialIndex, get_spatial_index
+
+logger = logging.getLogger(__name__)
+
+class OverlapGraph:
+    """
+    Outlets whose catchment areas overlap: every pair no more than radius_km apart.
+
+    Stored as a compressed adjacency list (CSR): the neighbors of the outlet at
+    position i are neighbor_positions[offsets[i]:offsets[i + 1]], nearest first.
+    Outlets without coordinates have no neighbors.
+    """
+
+    def __init__(self, index: SpatialIndex, radius_km: float):
+        self.radius_km = radius_km
+        self.outlet_ids = index.outlet_ids
+        self._positions = {int(outlet_id): position for position, outlet_id in enumerate(index.outlet_ids)}
+
+        sources, targets, distances = index.pairs_within(radius_km)
+        order = np.lexsort((distances, sources))
+        self.neighbor_positions = targets[order]
+        self.distances = distances[order]
+        self.offsets = np.searchsorted(sources[order], np.arange(len(index) + 1))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OutletSnapshot, radius_km: float) -> "OverlapGraph":
+        """Build the overlap graph of every located outlet in the snapshot."""
+        start = time.perf_counter()
+        graph = cls(get_spatial_index(snapshot), radius_km)
+        logger.info(
+            f"Built {radius_km:g} km overlap graph v{snapshot.version} with {len(graph.neighbor_positions)} edges "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return graph
+
+    def neighbors(self, outlet_id: int, radius_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Outlets within the graph radius (or a smaller radius_km) of an outlet.
+
+        Returns:
+            (outlet_id, distance_km) pairs ordered by increasing distance
+        """
+        position = self._positions.get(outlet_id)
+        if position is None:
+            return []
+        start, end = self.offsets[position], self.offsets[position + 1]
+        if radius_km is not None:
+            # Neighbors are sorted by distance, so a smaller radius is a prefix
+            end = start + np.searchsorted(self.distances[start:end], radius_km, side="right")
+        return [(int(self.outlet_ids[p]), float(d)) for p, d in zip(self.neighbor_positions[start:end], self.distances[start:end])]
+
+    def adjacency(self) -> Dict[int, List[Tuple[int, float]]]:
+        """Neighbors of every located outlet, keyed by outlet ID."""
+        neighbor_ids = self.outlet_ids[self.neighbor_positions].tolist()
+        distances = np.round(self.distances, 3).tolist()
+        return {
+            int(outlet_id): list(zip(neighbor_ids[self.offsets[position]:self.offsets[position + 1]],
+                                     distances[self.offsets[position]:self.offsets[position + 1]]))
+            for position, outlet_id in enumerate(self.outlet_ids)
+        }
+
+def graph_radius_for(radius_km: float) -> Optional[float]:
+    """The smallest precomputed radius that covers radius_km, or None if it exceeds them all."""
+    return next((radius for radius in GEO_CONFIG["overlap_radii_km"] if radius >= radius_km), None)
+
+def get_overlap_graph(snapshot: OutletSnapshot, radius_km: float) -> OverlapGraph:
+    """Return the overlap graph for one of the configured radii, building it once per data version."""
+    return snapshot.derived(f"overlap_graph:{radius_km:g}", lambda s: OverlapGraph.from_snapshot(s, radius_km))
+
+def _build_overlap_payload(snapshot: OutletSnapshot, radius_km: float) -> PrecompressedPayload:
+    body = {
+        "version": snapshot.version,
+        "radius": radius_km,
+        "adjacency": get_overlap_graph(snapshot, radius_km).adjacency(),
+    }
+    return build_payload(snapshot.version, json.dumps(body, separators=(",", ":")).encode())
+
+def get_overlap_payload(snapshot: OutletSnapshot, radius_km: float) -> PrecompressedPayload:
+    """Return the precompressed bulk adjacency export for a configured radius, building it once per data version."""
+    return snapshot.derived(f"overlap_payload:{radius_km:g}", lambda s: _build_overlap_payload(s, radius_km))
@@ -0,0 +1,123 @@
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from server.services.outlet_snapshot import OutletSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Higher weights rank first: a prefix of the outlet name beats its area, which beats the rest of the address
+NAME_WEIGHT = 3
+AREA_WEIGHT = 2
+ADDRESS_WEIGHT = 1
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase a string and split it into alphanumeric words."""
+    return _WORD_PATTERN.findall(text.lower()) if text else []
+
+def extract_area(address: Optional[str]) -> Optional[str]:
+    """Return the area part of an address (the second-to-last comma-separated component), like the client does."""
+    if not address:
+        return None
+    parts = [part.strip() for part in address.split(",")]
+    return parts[-2] if len(parts) >= 2 else parts[0]
+
+class _TrieNode:
+    __slots__ = ("children", "weights", "ranked")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.weights: Dict[int, int] = {}  # Outlet ID -> best weight of any key passing through this node
+        self.ranked: Tuple[int, ...] = ()  # Outlet IDs ordered by weight, then name
+
+class PrefixIndex:
+    """
+    Character trie over outlet names, area names and address words.
+
+    Every node keeps the outlets reachable below it already ranked, so a lookup
+    costs one walk down the trie plus slicing the first results.
+    """
+
+    def __init__(self, snapshot: OutletSnapshot):
+        self._root = _TrieNode()
+        self._names = {outlet.id: outlet.name for outlet in snapshot.outlets}
+        for outlet in snapshot.outlets:
+            name_words = tokenize(outlet.name)
+            area_words = tokenize(extract_area(outlet.address))
+            # Whole phrases are keys too, so "subway ban" matches "Subway Bangsar" directly
+            self._insert(" ".join(name_words), outlet.id, NAME_WEIGHT)
+            self._insert(" ".join(area_words), outlet.id, AREA_WEIGHT)
+            for word in name_words:
+                self._insert(word, outlet.id, NAME_WEIGHT)
+            for word in area_words:
+                self._insert(word, outlet.id, AREA_WEIGHT)
+            for word in tokenize(outlet.address):
+                self._insert(word, outlet.id, ADDRESS_WEIGHT)
+        self._rank(self._root)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OutletSnapshot) -> "PrefixIndex":
+        """Build a prefix index over every outlet in the snapshot."""
+        start = time.perf_counter()
+        index = cls(snapshot)
+        logger.info(f"Built prefix index v{snapshot.version} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return index
+
+    def _insert(self, key: str, outlet_id: int, weight: int):
+        if not key:
+            return
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            if node.weights.get(outlet_id, 0) < weight:
+                node.weights[outlet_id] = weight
+
+    def _rank(self, root: _TrieNode):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.ranked = tuple(sorted(node.weights, key=lambda outlet_id: (-node.weights[outlet_id], self._names[outlet_id])))
+            stack.extend(node.children.values())
+
+    def _find(self, key: str) -> Optional[_TrieNode]:
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """
+        Suggest outlets whose name, area or address words start with the given prefix.
+
+        A multi-word prefix first matches as a phrase; otherwise every word must
+        prefix-match some key of the outlet.
+
+        Returns:
+            (outlet_id, name) pairs, best matches first
+        """
+        words = tokenize(prefix)
+        if not words:
+            return []
+
+        phrase_node = self._find(" ".join(words))
+        ranked = list(phrase_node.ranked[:limit]) if phrase_node is not None else []
+        if len(words) > 1 and len(ranked) < limit:
+            nodes = [self._find(word) for word in words]
+            if all(node is not None for node in nodes):
+                # Walk the smallest candidate list in rank order, keeping outlets every word matches
+                nodes.sort(key=lambda node: len(node.ranked))
+                seen = set(ranked)
+                for outlet_id in nodes[0].ranked:
+                    if len(ranked) >= limit:
+                        break
+                    if outlet_id not in seen and all(outlet_id in node.weights for node in nodes[1:]):
+                        ranked.append(outlet_id)
+        return [(outlet_id, self._names[outlet_id]) for outlet_id in ranked]
+
+def get_prefix_index(snapshot: OutletSnapshot) -> PrefixIndex:
+    """Return the prefix index for a snapshot, building it once per data version."""
+    return snapshot.derived("prefix_index", PrefixIndex.from_snapshot)
@@ -0,0 +1,266 @@
+import logging
+import math
+import time
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+import numpy as np
+
+if TYPE_CHECKING:
+    # Only for annotations: the scrapers use this module (via outlet_neighbors) without the API layer
+    from server.services.outlet_snapshot import OutletSnapshot
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM  # Half the circumference; nothing is farther away
+
+# Grid cell edge in degrees (~5.5 km of latitude), sized for the default 5 km search radius
+DEFAULT_CELL_SIZE_DEG = 0.05
+
+def haversine_km(latitude, longitude, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance in kilometers from one point to arrays of points (all in degrees).
+
+    The origin may itself be an array; inputs broadcast like any NumPy operation,
+    so a column of origins against a row of points yields a distance matrix.
+    """
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlng = np.radians(longitudes) - np.radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class SpatialIndex:
+    """
+    Uniform latitude/longitude grid over outlet coordinates.
+
+    Points are sorted by (row, column) cell so that each grid row is a contiguous
+    slice whose columns can be binary-searched. A radius query therefore touches
+    only the cells overlapping the query's bounding box, and computes exact
+    haversine distances for just those candidates.
+    """
+
+    def __init__(self, outlet_ids: Iterable[int], latitudes: Iterable[float], longitudes: Iterable[float],
+                 cell_size_deg: float = DEFAULT_CELL_SIZE_DEG):
+        self.cell_size_deg = cell_size_deg
+        ids = np.asarray(list(outlet_ids), dtype=np.int64)
+        lats = np.asarray(list(latitudes), dtype=np.float64)
+        lngs = np.asarray(list(longitudes), dtype=np.float64)
+
+        rows = np.floor(lats / cell_size_deg).astype(np.int64)
+        cols = np.floor(lngs / cell_size_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+
+        self.outlet_ids = ids[order]
+        self.latitudes = lats[order]
+        self.longitudes = lngs[order]
+        self._rows = rows[order]
+        self._cols = cols[order]
+
+        # Start/end offsets of each occupied grid row within the sorted arrays
+        self._row_keys, self._row_starts = np.unique(self._rows, return_index=True)
+        self._row_ends = np.append(self._row_starts[1:], len(self._rows))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "OutletSnapshot") -> "SpatialIndex":
+        """Build an index over every outlet in the snapshot that has coordinates."""
+        start = time.perf_counter()
+        located = [o for o in snapshot.outlets if o.latitude is not None and o.longitude is not None]
+        index = cls(
+            (o.id for o in located),
+            (o.latitude for o in located),
+            (o.longitude for o in located),
+        )
+        logger.info(f"Built spatial index v{snapshot.version} over {len(index)} outlets in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.outlet_ids)
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Positions of points whose grid cell overlaps the bounding box of the search circle."""
+        if radius_km >= MAX_DISTANCE_KM:
+            return np.arange(len(self))
+        return self._padded_box(latitude, latitude, longitude, longitude, radius_km)
+
+    def _padded_box(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float, radius_km: float) -> np.ndarray:
+        """Positions of points whose grid cell overlaps a box grown by radius_km on every side."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        lat_min, lat_max = lat_min - dlat, lat_max + dlat
+        cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+        if lat_min <= -90 or lat_max >= 90 or cos_lat <= 1e-6:
+            return self._cells_in_box(lat_min, lat_max)  # Box covers a pole; every longitude qualifies
+        dlng = dlat / cos_lat
+        # Boxes crossing the antimeridian fall back to scanning whole rows
+        if dlng >= 180 or lng_min - dlng < -180 or lng_max + dlng > 180:
+            return self._cells_in_box(lat_min, lat_max)
+        return self._cells_in_box(lat_min, lat_max, lng_min - dlng, lng_max + dlng)
+
+    def _cells_in_box(self, lat_min: float, lat_max: float,
+                      lng_min: Optional[float] = None, lng_max: Optional[float] = None) -> np.ndarray:
+        """Positions of points in grid cells overlapping a box (without longitude bounds, whole rows)."""
+        row_min = math.floor(lat_min / self.cell_size_deg)
+        row_max = math.floor(lat_max / self.cell_size_deg)
+        first = np.searchsorted(self._row_keys, row_min, side="left")
+        last = np.searchsorted(self._row_keys, row_max, side="right")
+
+        slices = []
+        for start, end in zip(self._row_starts[first:last], self._row_ends[first:last]):
+            if lng_min is None:
+                slices.append(np.arange(start, end))
+                continue
+            row_cols = self._cols[start:end]
+            lo = start + np.searchsorted(row_cols, math.floor(lng_min / self.cell_size_deg), side="left")
+            hi = start + np.searchsorted(row_cols, math.floor(lng_max / self.cell_size_deg), side="right")
+            if hi > lo:
+                slices.append(np.arange(lo, hi))
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def within_bounds(self, south: float, west: float, north: float, east: float) -> List[int]:
+        """
+        Find outlets inside a latitude/longitude box.
+
+        A box whose west edge is greater than its east edge is taken to cross the antimeridian.
+
+        Returns:
+            Outlet IDs ordered by latitude, then longitude
+        """
+        if west <= east:
+            candidates = self._cells_in_box(south, north, west, east)
+            lngs = self.longitudes[candidates]
+            lng_mask = (lngs >= west) & (lngs <= east)
+        else:
+            candidates = self._cells_in_box(south, north)
+            lngs = self.longitudes[candidates]
+            lng_mask = (lngs >= west) | (lngs <= east)
+        lats = self.latitudes[candidates]
+        mask = lng_mask & (lats >= south) & (lats <= north)
+        return [int(outlet_id) for outlet_id in self.outlet_ids[candidates[mask]]]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find outlets within radius_km of a point.
+
+        Returns:
+            (outlet_id, distance_km) pairs ordered by increasing distance
+        """
+        candidates = self._candidates(latitude, longitude, radius_km)
+        if len(candidates) == 0:
+            return []
+        distances = haversine_km(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        mask = distances <= radius_km
+        candidates, distances = candidates[mask], distances[mask]
+        order = np.argsort(distances, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [(int(self.outlet_ids[candidates[i]]), float(distances[i])) for i in order]
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                max_radius_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Find the k outlets closest to a point, optionally no farther than max_radius_km.
+
+        The search radius starts at one grid cell and doubles until it holds at
+        least k outlets; every point outside that radius is farther than every
+        point inside it, so the first k hits are exact.
+
+        Returns:
+            (outlet_id, distance_km) pairs ordered by increasing distance
+        """
+        if k <= 0 or len(self) == 0:
+            return []
+        limit_km = min(max_radius_km, MAX_DISTANCE_KM) if max_radius_km is not None else MAX_DISTANCE_KM
+        radius_km = min(self.cell_size_deg * KM_PER_DEGREE_LAT, limit_km)
+        while True:
+            hits = self.within_radius(latitude, longitude, radius_km, limit=k)
+            if len(hits) >= k or radius_km >= limit_km:
+                return hits
+            radius_km = min(radius_km * 2, limit_km)
+
+    def _occupied_cells(self) -> List[Tuple[int, int]]:
+        """Start/end positions of each occupied grid cell (points are sorted by cell, so each is a contiguous run)."""
+        boundaries = np.flatnonzero((np.diff(self._rows) != 0) | (np.diff(self._cols) != 0)) + 1
+        return list(zip(np.concatenate(([0], boundaries)).tolist(), np.append(boundaries, len(self)).tolist()))
+
+    def _cell_candidates(self, position: int, radius_km: float) -> np.ndarray:
+        """Positions of points within radius_km of anywhere in the grid cell holding the given point (plus some farther)."""
+        if radius_km >= MAX_DISTANCE_KM:
+            return np.arange(len(self))
+        row, col = self._rows[position], self._cols[position]
+        return self._padded_box(row * self.cell_size_deg, (row + 1) * self.cell_size_deg,
+                                col * self.cell_size_deg, (col + 1) * self.cell_size_deg, radius_km)
+
+    def pairs_within(self, radius_km: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find every ordered pair of distinct outlets no more than radius_km apart.
+
+        Works one occupied grid cell at a time: the cell's points are compared
+        against the candidates around the cell in a single distance matrix,
+        instead of comparing every outlet against every other.
+
+        Returns:
+            (sources, targets, distances_km) arrays, where sources and targets
+            are positions in this index's outlet_ids
+        """
+        if len(self) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+
+        sources, targets, distances = [], [], []
+        for start, end in self._occupied_cells():
+            candidates = self._cell_candidates(start, radius_km)
+            matrix = haversine_km(self.latitudes[start:end, None], self.longitudes[start:end, None],
+                                  self.latitudes[candidates], self.longitudes[candidates])
+            cell_positions = np.arange(start, end)
+            mask = (matrix <= radius_km) & (cell_positions[:, None] != candidates)
+            source_rows, target_cols = np.nonzero(mask)
+            sources.append(cell_positions[source_rows])
+            targets.append(candidates[target_cols])
+            distances.append(matrix[mask])
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(distances)
+
+    def nearest_table(self, k: int, chunk_size: int = 256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the k nearest other outlets of every outlet.
+
+        Works one occupied grid cell at a time like pairs_within(). The search
+        radius around a cell doubles until each of its points has at least k
+        candidates inside the radius; every point beyond the radius is farther
+        than those, so the k closest are exact. Large cells are processed in
+        chunks of chunk_size points to bound the distance matrix.
+
+        Returns:
+            (sources, targets, distances_km) arrays ordered by source and then
+            distance, where sources and targets are positions in this index's outlet_ids
+        """
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+
+        sources, targets, distances = [], [], []
+        for cell_start, cell_end in self._occupied_cells():
+            radius_km = self.cell_size_deg * KM_PER_DEGREE_LAT
+            for start in range(cell_start, cell_end, chunk_size):
+                positions = np.arange(start, min(start + chunk_size, cell_end))
+                while True:
+                    candidates = self._cell_candidates(start, radius_km)
+                    matrix = haversine_km(self.latitudes[positions, None], self.longitudes[positions, None],
+                                          self.latitudes[candidates], self.longitudes[candidates])
+                    matrix[positions[:, None] == candidates] = np.inf  # An outlet is not its own neighbour
+                    if radius_km >= MAX_DISTANCE_KM or ((matrix <= radius_km).sum(axis=1) >= k).all():
+                        break
+                    radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
+                nearest = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+                nearest_distances = np.take_along_axis(matrix, nearest, axis=1)
+                order = np.argsort(nearest_distances, axis=1, kind="stable")
+                sources.append(np.repeat(positions, k))
+                targets.append(candidates[np.take_along_axis(nearest, order, axis=1)].ravel())
+                distances.append(np.take_along_axis(nearest_distances, order, axis=1).ravel())
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(distances)
+
+def get_spatial_index(snapshot: "OutletSnapshot") -> SpatialIndex:
+    """Return the spatial index for a snapshot, building it once per data version."""
+    return snapshot.derived("spatial_index", SpatialIndex.from_snapshot)
@@ -0,0 +1,267 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from server.config import TILE_CONFIG
+from server.services.outlet_snapshot import OutletSnapshot
+from server.services.spatial_index import get_spatial_index
+from server.services.marker_clusters import get_marker_clusters, mercator_xy
+
+logger = logging.getLogger(__name__)
+
+LAYER_NAME = "outlets"
+TILE_EXTENT = 4096  # Integer coordinate space of one tile
+# Points this far outside a tile (in tile units, 1/16 of the tile) are still encoded, so markers
+# straddling a tile edge are drawn whole on both sides
+TILE_BUFFER = 256
+
+_CACHE_DIR_PATTERN = re.compile(r"^v(\d+)-[0-9a-f]+$")
+
+# Minimal Mapbox Vector Tile (v2.1) protobuf encoding, covering the one point layer served here
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+def _key(field_number: int, wire_type: int) -> bytes:
+    return _varint((field_number << 3) | wire_type)
+
+def _length_delimited(field_number: int, payload: bytes) -> bytes:
+    return _key(field_number, 2) + _varint(len(payload)) + payload
+
+def _packed(field_number: int, values: List[int]) -> bytes:
+    return _length_delimited(field_number, b"".join(_varint(value) for value in values))
+
+def _encode_value(value: Any) -> bytes:
+    """Encode a property value as a Layer.Value message."""
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _key(6, 0) + _varint(_zigzag(value)) if value < 0 else _key(5, 0) + _varint(value)
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _length_delimited(1, str(value).encode("utf-8"))
+
+def encode_point_layer(features: List[Tuple[Optional[int], int, int, Dict[str, Any]]],
+                       name: str = LAYER_NAME, extent: int = TILE_EXTENT) -> bytes:
+    """
+    Encode point features as a single-layer vector tile.
+
+    Args:
+        features: (feature_id or None, x, y, properties) with x/y in tile coordinates
+        name: Layer name
+        extent: Tile coordinate extent
+
+    Returns:
+        The protobuf-encoded tile (empty bytes when there are no features)
+    """
+    if not features:
+        return b""
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    encoded_features = []
+    for feature_id, x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        # One MoveTo command (id 1, count 1) followed by the zigzag-encoded offset from (0, 0)
+        geometry = [(1 << 3) | 1, _zigzag(x), _zigzag(y)]
+        message = b""
+        if feature_id is not None:
+            message += _key(1, 0) + _varint(feature_id)
+        message += _packed(2, tags) + _key(3, 0) + _varint(1) + _packed(4, geometry)  # Type 1 = POINT
+        encoded_features.append(_length_delimited(2, message))
+
+    layer = _key(15, 0) + _varint(2) + _length_delimited(1, name.encode("utf-8"))
+    layer += b"".join(encoded_features)
+    layer += b"".join(_length_delimited(3, key.encode("utf-8")) for key in keys)
+    layer += b"".join(_length_delimited(4, _encode_value(value)) for _, value in values)
+    layer += _key(5, 0) + _varint(extent)
+    return _length_delimited(3, layer)
+
+@dataclass(frozen=True)
+class _TilePoints:
+    """Points of one zoom level in Web Mercator unit coordinates, sorted by x for range lookups."""
+    x: np.ndarray
+    y: np.ndarray
+    counts: np.ndarray  # 1 for individual outlets
+    outlet_ids: np.ndarray  # The outlet itself for single points
+
+    @classmethod
+    def sorted_by_x(cls, x: np.ndarray, y: np.ndarray, counts: np.ndarray, outlet_ids: np.ndarray) -> "_TilePoints":
+        order = np.argsort(x, kind="stable")
+        return cls(x[order], y[order], counts[order], outlet_ids[order])
+
+class VectorTileSet:
+    """
+    Mapbox Vector Tiles of outlet markers for one data version.
+
+    Zoom levels up to MAX_CLUSTER_ZOOM use the precomputed marker clusters
+    (features with "cluster" and "point_count"); deeper zooms carry individual
+    outlets with their "id" and "name". Tiles are rendered on first request and
+    kept in an in-memory LRU and in an on-disk cache keyed by the data version,
+    so each tile is generated at most once per data refresh.
+    """
+
+    def __init__(self, snapshot: OutletSnapshot, cache_dir: Optional[str] = TILE_CONFIG["cache_dir"],
+                 memory_cache_tiles: int = TILE_CONFIG["memory_cache_tiles"]):
+        self.version = snapshot.version
+        spatial_index = get_spatial_index(snapshot)
+        clusters = get_marker_clusters(snapshot)
+        self.max_cluster_zoom = clusters.max_zoom
+        self._names = {outlet.id: outlet.name for outlet in snapshot.outlets}
+
+        x, y = mercator_xy(spatial_index.latitudes, spatial_index.longitudes)
+        self._outlets = _TilePoints.sorted_by_x(x, y, np.ones(len(x), dtype=np.int64), spatial_index.outlet_ids)
+        self._levels: Dict[int, _TilePoints] = {}
+        for zoom, level in clusters.levels.items():
+            level_x, level_y = mercator_xy(level.latitudes, level.longitudes)
+            self._levels[zoom] = _TilePoints.sorted_by_x(level_x, level_y, level.counts, level.first_outlet_ids)
+
+        # The directory name covers the content too, so a reset database reusing a version number can't serve stale tiles
+        fingerprint = hashlib.sha256()
+        fingerprint.update(spatial_index.outlet_ids.tobytes())
+        fingerprint.update(spatial_index.latitudes.tobytes())
+        fingerprint.update(spatial_index.longitudes.tobytes())
+        for outlet_id in spatial_index.outlet_ids:
+            fingerprint.update(self._names[int(outlet_id)].encode("utf-8"))
+        self.cache_key = f"v{self.version}-{fingerprint.hexdigest()[:16]}"
+        self.cache_dir = os.path.join(cache_dir, self.cache_key) if cache_dir else None
+
+        self._memory: "OrderedDict[Tuple[int, int, int], bytes]" = OrderedDict()
+        self._memory_limit = memory_cache_tiles
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "rendered": 0}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OutletSnapshot) -> "VectorTileSet":
+        """Prepare the tile set for a snapshot and clear disk caches of older data versions."""
+        start = time.perf_counter()
+        tiles = cls(snapshot)
+        if tiles.cache_dir:
+            tiles._prune_disk_cache()
+        logger.info(f"Prepared vector tiles {tiles.cache_key} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return tiles
+
+    def _prune_disk_cache(self):
+        """Remove on-disk tiles of older data versions (other processes may still be on this one)."""
+        root = os.path.dirname(self.cache_dir)
+        try:
+            entries = os.listdir(root)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            match = _CACHE_DIR_PATTERN.match(entry)
+            if match and int(match.group(1)) < self.version:
+                shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+    def cached(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Return a tile from the in-memory cache, or None."""
+        with self._lock:
+            tile = self._memory.get((z, x, y))
+            if tile is not None:
+                self._memory.move_to_end((z, x, y))
+                self.stats["memory_hits"] += 1
+            return tile
+
+    def get(self, z: int, x: int, y: int) -> bytes:
+        """Return a tile, from memory, then disk, rendering and caching it on a miss."""
+        tile = self.cached(z, x, y)
+        if tile is not None:
+            return tile
+        tile = self._read_disk(z, x, y)
+        if tile is None:
+            tile = self.render(z, x, y)
+            self._write_disk(z, x, y, tile)
+        with self._lock:
+            self._memory[(z, x, y)] = tile
+            if len(self._memory) > self._memory_limit:
+                self._memory.popitem(last=False)
+        return tile
+
+    def _tile_path(self, z: int, x: int, y: int) -> str:
+        return os.path.join(self.cache_dir, str(z), str(x), f"{y}.mvt")
+
+    def _read_disk(self, z: int, x: int, y: int) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._tile_path(z, x, y), "rb") as f:
+                tile = f.read()
+        except OSError:
+            return None
+        self.stats["disk_hits"] += 1
+        return tile
+
+    def _write_disk(self, z: int, x: int, y: int, tile: bytes):
+        """Write a tile to the disk cache atomically; failures only cost a re-render later."""
+        if not self.cache_dir:
+            return
+        path = self._tile_path(z, x, y)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+                f.write(tile)
+            os.replace(f.name, path)
+        except OSError as e:
+            logger.warning(f"Could not write tile {z}/{x}/{y} to the disk cache: {e}")
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        """Encode the features of one tile."""
+        clustered = z <= self.max_cluster_zoom
+        points = self._levels[z] if clustered else self._outlets
+        scale = 1 << z
+        buffer = TILE_BUFFER / TILE_EXTENT
+        lo, hi = np.searchsorted(points.x, [(x - buffer) / scale, (x + 1 + buffer) / scale])
+        local_x = (points.x[lo:hi] * scale - x) * TILE_EXTENT
+        local_y = (points.y[lo:hi] * scale - y) * TILE_EXTENT
+        inside = (local_y >= -TILE_BUFFER) & (local_y <= TILE_EXTENT + TILE_BUFFER)
+
+        features = []
+        for i in np.flatnonzero(inside):
+            tile_x, tile_y = int(round(local_x[i])), int(round(local_y[i]))
+            count = int(points.counts[lo + i])
+            if count > 1:
+                features.append((None, tile_x, tile_y, {"cluster": True, "point_count": count}))
+            else:
+                outlet_id = int(points.outlet_ids[lo + i])
+                features.append((outlet_id, tile_x, tile_y, {"id": outlet_id, "name": self._names[outlet_id]}))
+        self.stats["rendered"] += 1
+        return encode_point_layer(features)
+
+    def occupied_tiles(self, z: int) -> List[Tuple[int, int]]:
+        """(x, y) of the tiles at a zoom level that contain at least one point."""
+        points = self._levels[z] if z <= self.max_cluster_zoom else self._outlets
+        scale = 1 << z
+        tiles = np.unique(np.stack([np.floor(points.x * scale), np.floor(points.y * scale)], axis=1).astype(np.int64), axis=0)
+        return [(int(tile_x), int(tile_y)) for tile_x, tile_y in tiles]
+
+    def warm(self, max_zoom: int = TILE_CONFIG["warm_max_zoom"]) -> int:
+        """Render (or load from disk) every non-empty tile up to max_zoom; returns the number of tiles."""
+        count = 0
+        for z in range(max_zoom + 1):
+            for tile_x, tile_y in self.occupied_tiles(z):
+                self.get(z, tile_x, tile_y)
+                count += 1
+        return count
+
+def get_vector_tiles(snapshot: OutletSnapshot) -> VectorTileSet:
+    """Return the vector tile set for a snapshot, creating it once per data version."""
+    return snapshot.derived("vector_tiles", VectorTileSet.from_snapshot)
@@ -0,0 +1,41 @@
+from datetime import time
+
+from server.chatbot.answer_renderer import AnswerRenderer
+from server.chatbot.intent_router import TEMPLATES, IntentMatch, IntentRouter
+
+def open_now_rows(count: int):
+    return [
+        {"id": index, "name": f"Subway {index:02d}", "address": f"Jalan {index}, Bangsar",
+         "opening_time": time(8), "closing_time": time(22), "is_closed": False}
+        for index in range(count)
+    ]
+
+def open_now_intent(limit: int) -> IntentMatch:
+    return IntentMatch("open_now", TEMPLATES["open_now"], {"pattern": "%bangsar%", "limit": limit, "tz": "UTC"},
+                       time_dependent=True)
+
+def test_router_fetches_one_row_past_the_list_limit():
+    router = IntentRouter(db_engine=None, list_limit=10)
+    match = router.route("Which outlets are open now in Bangsar?", data_version=1)
+    assert match.intent == "open_now"
+    assert match.params["limit"] == 11
+
+def test_open_list_within_limit_is_rendered_in_full():
+    answer = AnswerRenderer(list_max_rows=10).render(open_now_rows(4), open_now_intent(11))
+    assert answer.startswith("4 outlets in Bangsar are open now:")
+    assert "Subway 03" in answer
+
+def test_open_list_past_limit_is_truncated():
+    answer = AnswerRenderer(list_max_rows=10).render(open_now_rows(11), open_now_intent(11))
+    assert answer.startswith("More than 10 outlets in Bangsar are open now. Here are the first 10:")
+    assert "10. **Subway 09**" in answer
+    assert "Subway 10" not in answer
+
+def test_outlet_count_from_generated_sql_is_rendered():
+    assert AnswerRenderer().render([{"outlet_count": 6}]) == "I found **6** matching outlets."
+
+def test_other_counts_from_generated_sql_go_to_gemini():
+    renderer = AnswerRenderer()
+    assert renderer.render([{"day_count": 6}]) is None
+    assert renderer.render([{"total_reviews": 120}]) is None
+    assert renderer.render([{"count": 3}]) is None
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from server.chatbot.intent_router import IntentRouter
+from server.db.models import Base
+
+OUTLETS = [(1, "Subway KLCC"), (2, "Subway Bangsar"), (3, "Subway Monash"), (4, "Subway Sunway Pyramid")]
+
+@pytest.fixture
+def router():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for outlet_id, name in OUTLETS:
+            conn.execute(text("INSERT INTO outlets (id, name) VALUES (:id, :name)"), {"id": outlet_id, "name": name})
+        for rank, neighbor_id in enumerate((4, 2, 3), 1):
+            conn.execute(text("INSERT INTO outlet_neighbors (outlet_id, rank, neighbor_id, distance_km) "
+                              "VALUES (1, :rank, :neighbor_id, :distance)"),
+                         {"rank": rank, "neighbor_id": neighbor_id, "distance": rank * 1.5})
+    yield IntentRouter(engine, list_limit=10, closest_limit=5, timezone="Asia/Kuala_Lumpur")
+    engine.dispose()
+
+# Every suggestion the chat client offers (ChatBot.jsx and useSuggestions.js, with "Subway KLCC" as the mentioned outlet)
+@pytest.mark.parametrize("question, intent, params", [
+    ("Which Subway outlets are in Bangsar?", None, {}),
+    ("Is Subway KLCC open on Sundays?", "outlet_open_on_day", {"outlet_id": 1, "day": "Sunday"}),
+    ("Which outlet closes the latest?", None, {}),
+    ("What are the operating hours for Subway KLCC?", "outlet_hours", {"outlet_id": 1}),
+    ("Where exactly is Subway KLCC located?", "outlet_location", {"outlet_id": 1}),
+    ("Is Subway KLCC open on weekends?", None, {}),
+    ("Which outlet is open the latest?", None, {}),
+    ("Which outlets are open on Sundays?", "open_on_day", {"day": "Sunday", "pattern": None}),
+    ("How many outlets are in Kuala Lumpur?", "count_by_area", {"pattern": "%kuala lumpur%"}),
+    ("Which outlet is closest to KLCC?", "closest_to_outlet", {"outlet_id": 1, "limit": 1, "include_self": True}),
+    ("Are there any Subway outlets in Bangsar?", None, {}),
+    ("How to navigate to Subway Monash Outlet?", "directions", {"outlet_id": 3}),
+    ("How many Subway outlets are there in Bangsar area?", "count_by_area", {"pattern": "%bangsar%"}),
+])
+def test_client_suggestions(router, question, intent, params):
+    match = router.route(question, data_version=1)
+    if intent is None:
+        assert match is None
+    else:
+        assert match.intent == intent
+        assert params.items() <= match.params.items()
+
+@pytest.mark.parametrize("question", [
+    "How many outlets have drive thru in KL?",
+    "How many 24 hour outlets are there?",
+    "Is Subway KLCC open late on Friday?",
+    "Which outlets are open on weekdays in Bangsar?",
+])
+def test_filters_the_templates_cannot_express_go_to_gemini(router, question):
+    assert router.route(question, data_version=1) is None
+
+def test_closest_to_outlet_includes_the_named_outlet(router):
+    with router.db_engine.connect() as conn:
+        match = router.route("What are the 3 closest outlets to KLCC?", data_version=1)
+        rows = conn.execute(text(match.sql), match.params).fetchall()
+        assert [row.name for row in rows] == ["Subway KLCC", "Subway Sunway Pyramid", "Subway Bangsar"]
+
+        match = router.route("Which other outlets are closest to Subway KLCC?", data_version=1)
+        rows = conn.execute(text(match.sql), match.params).fetchall()
+        assert [row.name for row in rows] == ["Subway Sunway Pyramid", "Subway Bangsar", "Subway Monash"]
@@ -0,0 +1,55 @@
+from datetime import time
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from server.db import engine as engine_registry
+from server.db.db_manager import DatabaseManager
+from server.db.models import Base, Outlet, OperatingHours
+
+CONNECTION_PARAMS = {"user": "test", "password": "test", "host": "localhost", "port": 5432, "dbname": "outlet_queries"}
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+@pytest.fixture
+def db_engine(monkeypatch):
+    """In-memory SQLite engine registered as the shared engine for CONNECTION_PARAMS."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    monkeypatch.setitem(engine_registry._engines, engine_registry.build_db_url(CONNECTION_PARAMS), engine)
+    yield engine
+    engine.dispose()
+
+def add_outlets(start: int, stop: int):
+    with DatabaseManager(**CONNECTION_PARAMS) as db_manager:
+        for index in range(start, stop):
+            outlet = Outlet(name=f"Subway {index}", address=f"Jalan {index}, Kuala Lumpur")
+            outlet.operating_hours = [
+                OperatingHours(day_of_week=day, opening_time=time(8), closing_time=time(22)) for day in DAYS
+            ]
+            db_manager.session.add(outlet)
+        db_manager.session.commit()
+
+def count_outlet_list_queries(db_engine) -> int:
+    """Number of statements issued to load every outlet and read its operating hours."""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        with DatabaseManager(**CONNECTION_PARAMS) as db_manager:
+            for outlet in db_manager.query_outlets_with_hours().all():
+                assert len(outlet.operating_hours) == len(DAYS)
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+    return len(statements)
+
+def test_outlet_list_query_count_is_constant(db_engine):
+    add_outlets(0, 3)
+    few = count_outlet_list_queries(db_engine)
+    add_outlets(3, 60)
+    many = count_outlet_list_queries(db_engine)
+
+    # One SELECT for the outlets plus one selectin SELECT for all of their hours
+    assert few == 2
+    assert many == few